@@ -1,214 +1,594 @@
 """Main agent orchestration using Claude Agent SDK."""
 import os
 import json
-from typing import Dict, List, Any
-from anthropic import Anthropic
+import asyncio
+import logging
+import shelve
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional, Tuple
+import orjson
+from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
 
 from data_retrieval import DataRetrieval
 from blockchain_api import BlockchainExplorerAPI
-from trm_api import TRMLabsAPI
+from trm_api import get_default_client
 from graph_builder import GraphBuilder
 from visualization import IncidentVisualizer
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-class BlockchainIncidentAgent:
-    """Agent for analyzing and visualizing blockchain security incidents."""
+# Maximum number of tool calls from one assistant turn executed in parallel
+MAX_TOOL_WORKERS = 8
 
-    def __init__(self):
-        """Initialize the agent with necessary components."""
-        self.anthropic_client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-        self.data_retrieval = DataRetrieval()
-        self.trm_api = TRMLabsAPI()
-        self.visualizer = IncidentVisualizer()
-        self.current_incident_id = None  # Track current incident for caching
+# Tool results from the last N turns are sent verbatim; older ones are compacted
+KEEP_FULL_TOOL_RESULT_TURNS = 2
 
-        # Define tools for the agent
-        self.tools = [
-            {
-                "name": "get_incident_data",
-                "description": "Retrieve incident data including blockchain addresses from the local datastore",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "incident_id": {
-                            "type": "string",
-                            "description": "Optional incident ID to retrieve. If not provided, returns the first incident."
-                        }
-                    },
-                    "required": []
+# Older tool results without a cache key are only compacted above this size
+COMPACT_MIN_CHARS = 2000
+
+# zlib level for cache entries; low levels already shrink the repetitive JSON several-fold
+CACHE_COMPRESSION_LEVEL = 3
+
+# Tool definitions exposed to the model. Built once at import and shared by every
+# agent instance and every turn, since the schema never changes at runtime.
+TOOLS = [
+    {
+        "name": "get_incident_data",
+        "description": "Retrieve incident data including blockchain addresses from the local datastore",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "incident_id": {
+                    "type": "string",
+                    "description": "Optional incident ID to retrieve. If not provided, returns the first incident."
                 }
             },
-            {
-                "name": "fetch_address_info",
-                "description": "Fetch detailed information about a blockchain address using TRM Labs API",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "address": {
-                            "type": "string",
-                            "description": "The blockchain address to query"
-                        },
-                        "blockchain": {
-                            "type": "string",
-                            "description": "The blockchain network (default: ethereum)",
-                            "default": "ethereum"
-                        }
-                    },
-                    "required": ["address"]
+            "required": []
+        }
+    },
+    {
+        "name": "fetch_address_info",
+        "description": "Fetch detailed information about a blockchain address using TRM Labs API",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "address": {
+                    "type": "string",
+                    "description": "The blockchain address to query"
+                },
+                "blockchain": {
+                    "type": "string",
+                    "description": "The blockchain network (default: ethereum)",
+                    "default": "ethereum"
                 }
             },
-            {
-                "name": "fetch_risk_assessment",
-                "description": "Fetch risk assessment for a blockchain address",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "address": {
-                            "type": "string",
-                            "description": "The blockchain address to assess"
-                        },
-                        "blockchain": {
-                            "type": "string",
-                            "description": "The blockchain network (default: ethereum)",
-                            "default": "ethereum"
-                        }
-                    },
-                    "required": ["address"]
+            "required": ["address"]
+        }
+    },
+    {
+        "name": "fetch_risk_assessment",
+        "description": "Fetch risk assessment for a blockchain address",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "address": {
+                    "type": "string",
+                    "description": "The blockchain address to assess"
+                },
+                "blockchain": {
+                    "type": "string",
+                    "description": "The blockchain network (default: ethereum)",
+                    "default": "ethereum"
                 }
             },
-            {
-                "name": "fetch_transactions",
-                "description": "Fetch transaction history for an address and its network from Etherscan/BscScan API. Returns a cache key to avoid context bloat.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "address": {
-                            "type": "string",
-                            "description": "The blockchain address to query"
-                        },
-                        "blockchain": {
-                            "type": "string",
-                            "description": "The blockchain network (ethereum or bsc)",
-                            "default": "ethereum"
-                        },
-                        "limit": {
-                            "type": "integer",
-                            "description": "Maximum number of transactions to fetch per address",
-                            "default": 30
-                        },
-                        "network_depth": {
-                            "type": "integer",
-                            "description": "Network depth to explore (1=only address, 2=address+connected, etc.)",
-                            "default": 2
-                        }
-                    },
-                    "required": ["address", "blockchain"]
+            "required": ["address"]
+        }
+    },
+    {
+        "name": "fetch_transactions",
+        "description": "Fetch transaction history for an address and its network from Etherscan/BscScan API. Returns a cache key to avoid context bloat.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "address": {
+                    "type": "string",
+                    "description": "The blockchain address to query"
+                },
+                "blockchain": {
+                    "type": "string",
+                    "description": "The blockchain network (ethereum or bsc)",
+                    "default": "ethereum"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of transactions to fetch per address",
+                    "default": 30
+                },
+                "network_depth": {
+                    "type": "integer",
+                    "description": "Network depth to explore (1=only address, 2=address+connected, etc.)",
+                    "default": 2
                 }
             },
-            {
-                "name": "build_transaction_graph",
-                "description": "Build graph structure from cached transaction data with optional TRM sanctions screening. Stores network in cache and returns a reference to avoid context bloat.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "cache_key": {
-                            "type": "string",
-                            "description": "Cache key returned from fetch_transactions"
-                        },
-                        "primary_address": {
-                            "type": "string",
-                            "description": "The primary address being analyzed"
-                        },
-                        "blockchain": {
-                            "type": "string",
-                            "description": "The blockchain network"
-                        },
-                        "addresses_to_screen": {
-                            "type": "array",
-                            "description": "List of addresses to check against TRM Sanctions API (empty array = no screening)",
-                            "default": []
-                        }
-                    },
-                    "required": ["cache_key", "primary_address", "blockchain"]
+            "required": ["address", "blockchain"]
+        }
+    },
+    {
+        "name": "build_transaction_graph",
+        "description": "Build graph structure from cached transaction data with optional TRM sanctions screening. Stores network in cache and returns a reference to avoid context bloat.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "cache_key": {
+                    "type": "string",
+                    "description": "Cache key returned from fetch_transactions"
+                },
+                "primary_address": {
+                    "type": "string",
+                    "description": "The primary address being analyzed"
+                },
+                "blockchain": {
+                    "type": "string",
+                    "description": "The blockchain network"
+                },
+                "addresses_to_screen": {
+                    "type": "array",
+                    "description": "List of addresses to check against TRM Sanctions API (empty array = no screening)",
+                    "default": []
                 }
             },
-            {
-                "name": "generate_visualization",
-                "description": "Generate an HTML file with three.js visualization of the incident. Reads network data from cache. NOTE: This should be called AFTER you have completed your analysis, so you can include your comprehensive analysis text in the HTML.",
-                "input_schema": {
+            "required": ["cache_key", "primary_address", "blockchain"]
+        }
+    },
+    {
+        "name": "generate_visualization",
+        "description": "Generate an HTML file with three.js visualization of the incident. Reads network data from cache. NOTE: This should be called AFTER you have completed your analysis, so you can include your comprehensive analysis text in the HTML.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "incident_data": {
+                    "type": "object",
+                    "description": "Incident information"
+                },
+                "network_cache_key": {
+                    "type": "string",
+                    "description": "Network cache key returned from build_transaction_graph"
+                },
+                "risk_data": {
                     "type": "object",
-                    "properties": {
-                        "incident_data": {
-                            "type": "object",
-                            "description": "Incident information"
-                        },
-                        "network_cache_key": {
-                            "type": "string",
-                            "description": "Network cache key returned from build_transaction_graph"
-                        },
-                        "risk_data": {
-                            "type": "object",
-                            "description": "Risk assessment data"
-                        },
-                        "output_path": {
-                            "type": "string",
-                            "description": "Path where the HTML file should be saved"
-                        },
-                        "analysis_text": {
-                            "type": "string",
-                            "description": "Your comprehensive analysis text in markdown format to be displayed in the HTML"
-                        }
-                    },
-                    "required": ["incident_data", "network_cache_key", "risk_data", "output_path", "analysis_text"]
+                    "description": "Risk assessment data"
+                },
+                "output_path": {
+                    "type": "string",
+                    "description": "Path where the HTML file should be saved"
+                },
+                "analysis_text": {
+                    "type": "string",
+                    "description": "Your comprehensive analysis text in markdown format to be displayed in the HTML"
                 }
-            }
-        ]
+            },
+            "required": ["incident_data", "network_cache_key", "risk_data", "output_path", "analysis_text"]
+        },
+        # Tool definitions are static; cache them as a prompt prefix
+        "cache_control": {"type": "ephemeral"}
+    }
+]
+
+
+def _truncated_json(obj: Any, limit: int = 500) -> str:
+    """
+    Pretty-print the start of an object as JSON without encoding all of it.
+
+    Args:
+        obj: JSON-serializable object
+        limit: Maximum number of characters to return
+
+    Returns:
+        At most `limit` characters of the indented JSON encoding
+    """
+    chunks = []
+    size = 0
+    for chunk in json.JSONEncoder(indent=2).iterencode(obj):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return "".join(chunks)[:limit]
+
+
+def _compact_tool_results(messages: List[Dict], keep_turns: int = KEEP_FULL_TOOL_RESULT_TURNS) -> None:
+    """
+    Replace stale tool_result payloads with short placeholders, in place.
+
+    Results that returned a cache key keep only that key; other results are
+    elided only when large. The initial instructions are never touched, so the
+    cached prompt prefix stays stable.
+
+    Args:
+        messages: Conversation history sent to the API
+        keep_turns: Number of most recent tool result turns to keep verbatim
+    """
+    result_turns = [
+        message for message in messages
+        if message["role"] == "user" and isinstance(message["content"], list)
+        and any(isinstance(part, dict) and part.get("type") == "tool_result" for part in message["content"])
+    ]
+
+    for message in result_turns[:-keep_turns] if keep_turns else result_turns:
+        for part in message["content"]:
+            content = part.get("content")
+            if not isinstance(content, str) or content.startswith("["):
+                continue  # Already compacted (tool results are JSON objects)
+
+            try:
+                result = json.loads(content)
+            except ValueError:
+                result = None
+
+            cache_key = None
+            if isinstance(result, dict):
+                cache_key = result.get("cache_key") or result.get("network_cache_key")
+
+            if cache_key:
+                part["content"] = f"[cached: {cache_key}]"
+            elif len(content) > COMPACT_MIN_CHARS:
+                part["content"] = f"[elided: {len(content)}-char tool result already processed]"
+
+
+def _intern_addresses(transactions: Dict[str, List[Dict]]) -> None:
+    """
+    Intern address and hash strings of a transaction set, in place.
+
+    The same addresses recur across thousands of transactions; interning
+    collapses them to one object each and lets GraphBuilder's comparisons and
+    dict lookups short-circuit on identity. Freshly fetched transactions
+    already carry interned addresses from the explorer's normalizers, so this
+    is only needed for sets decoded from the disk cache.
+
+    Args:
+        transactions: Dictionary with 'normal' and 'token' transaction lists
+    """
+    intern = sys.intern
+    for tx_list in (transactions.get("normal", []), transactions.get("token", [])):
+        for tx in tx_list:
+            for field in ("from", "to", "contractAddress", "hash"):
+                value = tx.get(field)
+                if isinstance(value, str):
+                    tx[field] = intern(value)
 
-    def process_tool_call(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+
+class BlockchainIncidentAgent:
+    """Agent for analyzing and visualizing blockchain security incidents."""
+
+    def __init__(self):
+        """Initialize the agent with necessary components."""
+        self.anthropic_client = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        self.data_retrieval = DataRetrieval()
+        # Shared client: one connection pool, and screening results persist across runs
+        self.trm_api = get_default_client()
+        self.visualizer = IncidentVisualizer()
+        self.current_incident_id = None  # Track current incident for caching
+        self._tool_cache: Dict[tuple, Any] = {}  # Memoized read-only tool results
+        self._state_lock = threading.Lock()  # Guards shared state across parallel tool calls
+
+        # In-process transaction/network caches keyed by (incident_id, cache_key).
+        # Disk copies are written in the background for crash recovery only.
+        self._tx_cache: Dict[Tuple[Optional[str], str], Dict] = {}
+        self._net_cache: Dict[Tuple[Optional[str], str], Dict] = {}
+        self._spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-spill")
+
+        # One append-friendly cache database per (cache root, incident), opened lazily.
+        # Some dbm backends (dbm.sqlite3, the default from Python 3.13) only work from the
+        # thread that opened them, so these are opened, read, written and closed on the
+        # spill thread alone.
+        self._cache_dbs: Dict[str, shelve.Shelf] = {}
+
+        # Explorer clients reused across calls so their HTTP connection pools stay warm
+        self._explorers: Dict[Tuple[Optional[str], str], BlockchainExplorerAPI] = {}
+
+        # Define tools for the agent
+        self.tools = TOOLS
+
+        # Tool name -> bound handler, built once instead of walking an if/elif chain per call
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "get_incident_data": self._handle_get_incident_data,
+            "fetch_address_info": self._handle_fetch_address_info,
+            "fetch_risk_assessment": self._handle_fetch_risk_assessment,
+            "fetch_transactions": self._handle_fetch_transactions,
+            "build_transaction_graph": self._handle_build_transaction_graph,
+            "generate_visualization": self._handle_generate_visualization,
+        }
+
+    def _memoized(self, tool_name: str, tool_input: Dict[str, Any], compute: Callable[[], Any]) -> Any:
         """
-        Process a tool call from the agent.
+        Return the result of an earlier identical tool call, computing it on first use.
 
         Args:
-            tool_name: Name of the tool to call
-            tool_input: Input parameters for the tool
+            tool_name: Name of the tool being called
+            tool_input: Input parameters used as part of the cache key
+            compute: Callable producing the result on a cache miss
 
         Returns:
-            Result of the tool execution
+            Cached or freshly computed tool result
+        """
+        key = (tool_name, json.dumps(tool_input, sort_keys=True))
+        if key in self._tool_cache:
+            return self._tool_cache[key]
+
+        result = compute()
+        # Don't pin failures; a later call may succeed once its inputs exist
+        if not (isinstance(result, dict) and "error" in result):
+            with self._state_lock:
+                self._tool_cache[key] = result
+        return result
+
+    def _get_explorer(self, blockchain: str) -> BlockchainExplorerAPI:
+        """
+        Get the blockchain API client for the current incident, creating it once.
+
+        Args:
+            blockchain: The blockchain network
+
+        Returns:
+            Blockchain API client with caching support
+        """
+        key = (self.current_incident_id, blockchain)
+        with self._state_lock:
+            explorer = self._explorers.get(key)
+            if explorer is None:
+                explorer = self._explorers[key] = BlockchainExplorerAPI(
+                    blockchain=blockchain,
+                    incident_id=self.current_incident_id
+                )
+        return explorer
+
+    def _cache_path(self, cache_root: str, incident_id: Optional[str] = None) -> str:
+        """
+        Get the path of the single cache database holding an incident's entries.
+
+        Args:
+            cache_root: Cache root directory (transaction-cache or network-cache)
+            incident_id: Incident ID (defaults to the current incident)
+
+        Returns:
+            Path to the cache database
+        """
+        if incident_id is None:
+            incident_id = self.current_incident_id
+        return os.path.join(cache_root, str(incident_id), "cache.db")
+
+    def _cache_db(self, cache_path: str) -> shelve.Shelf:
+        """
+        Open (once) the cache database at the given path. Runs on the spill thread only.
+
+        Args:
+            cache_path: Path to the cache database
+
+        Returns:
+            Open shelf for the cache database
+        """
+        db = self._cache_dbs.get(cache_path)
+        if db is None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            db = self._cache_dbs[cache_path] = shelve.open(cache_path)
+        return db
+
+    def _cache_get(
+        self,
+        memory: Dict,
+        cache_root: str,
+        cache_key: str,
+        on_load: Optional[Callable[[Dict], None]] = None
+    ) -> Optional[Dict]:
+        """
+        Read a cached entry from memory, falling back to the disk copy.
+
+        Args:
+            memory: In-process cache dictionary to consult first
+            cache_root: Cache root directory for the disk fallback
+            cache_key: Key of the cached entry
+            on_load: Optional in-place fixup for an entry decoded from disk, applied once
+                before it is cached in memory (entries in memory must not be mutated)
+
+        Returns:
+            Cached data, or None if it is not cached
+        """
+        key = (self.current_incident_id, cache_key)
+        if key in memory:
+            return memory[key]
+
+        # Queued behind any pending writes, so an entry put earlier is always found
+        raw = self._spill_executor.submit(
+            self._read_cache_entry, self._cache_path(cache_root), cache_key
+        ).result()
+        if raw is None:
+            return None
+
+        try:
+            raw = zlib.decompress(raw)
+        except zlib.error:
+            pass  # Entry written before compression was enabled
+        data = orjson.loads(raw)
+        if on_load is not None:
+            on_load(data)
+        memory[key] = data
+        return data
+
+    def _cache_put(self, memory: Dict, cache_root: str, cache_key: str, data: Dict) -> str:
+        """
+        Store an entry in memory and spill it to disk in the background.
+
+        Args:
+            memory: In-process cache dictionary
+            cache_root: Cache root directory for the disk copy
+            cache_key: Key of the cached entry
+            data: Data to cache (must not be mutated afterwards)
+
+        Returns:
+            Path of the cache database the disk copy is written to
+        """
+        memory[(self.current_incident_id, cache_key)] = data
+        cache_path = self._cache_path(cache_root)
+        self._spill_executor.submit(self._write_cache_entry, cache_path, cache_key, data)
+        return cache_path
+
+    def _read_cache_entry(self, cache_path: str, cache_key: str) -> Optional[bytes]:
+        """
+        Read a raw cache entry from its incident's cache database. Runs on the spill thread.
+
+        Args:
+            cache_path: Path to the cache database
+            cache_key: Key of the cached entry
+
+        Returns:
+            Stored payload, or None if it is missing or unreadable
+        """
+        try:
+            return self._cache_db(cache_path).get(cache_key)
+        except Exception as e:
+            logger.warning("Error reading cache entry %s from %s: %s", cache_key, cache_path, e)
+            return None
+
+    def _write_cache_entry(self, cache_path: str, cache_key: str, data: Dict) -> None:
+        """
+        Write a cache entry to its incident's cache database. Runs on the spill thread.
+
+        Args:
+            cache_path: Path to the cache database
+            cache_key: Key of the cached entry
+            data: Data to serialize
+        """
+        try:
+            payload = zlib.compress(orjson.dumps(data), CACHE_COMPRESSION_LEVEL)
+            db = self._cache_db(cache_path)
+            db[cache_key] = payload
+            db.sync()
+        except Exception as e:
+            logger.warning("Error writing cache entry %s to %s: %s", cache_key, cache_path, e)
+
+    def _close_cache_dbs(self) -> None:
+        """Close the open cache databases. Runs on the spill thread."""
+        for cache_path, db in self._cache_dbs.items():
+            try:
+                db.close()
+            except Exception as e:
+                logger.warning("Error closing cache database %s: %s", cache_path, e)
+        self._cache_dbs.clear()
+
+    def close(self) -> None:
+        """Flush pending cache writes and close the cache databases."""
+        # Queued after any pending writes, on the thread that opened the databases
+        self._spill_executor.submit(self._close_cache_dbs)
+        self._spill_executor.shutdown(wait=True)
+
+    def _build_transaction_graph(self, tool_input: Dict[str, Any]) -> Dict:
+        """
+        Build the transaction graph from cached transactions and cache the network.
+
+        Args:
+            tool_input: Input parameters of the build_transaction_graph tool
+
+        Returns:
+            Network metadata stub, or an error dictionary
         """
-        if tool_name == "get_incident_data":
-            incident_id = tool_input.get("incident_id")
-            result = self.data_retrieval.get_incident(incident_id)
-            # Store incident ID for caching
-            if result and "id" in result:
+        cache_key = tool_input["cache_key"]
+        primary_address = tool_input["primary_address"]
+        blockchain = tool_input["blockchain"]
+        addresses_to_screen = tool_input.get("addresses_to_screen", [])
+
+        # Read transactions from cache
+        transactions = self._cache_get(
+            self._tx_cache, "transaction-cache", cache_key, on_load=_intern_addresses
+        )
+        if transactions is None:
+            return {"error": f"No cached transactions for cache_key: {cache_key}"}
+
+        # Build graph
+        builder = GraphBuilder(primary_address, blockchain)
+        builder.add_transactions(transactions)
+
+        # Screen all requested addresses with one batch request
+        screen_results = self.trm_api.screen_addresses_batch(addresses_to_screen, blockchain)
+
+        # Build network with optional TRM sanctions screening
+        network = builder.build_network(
+            addresses_to_screen=addresses_to_screen,
+            screen_results=screen_results
+        )
+
+        # Store network data in cache to avoid context bloat
+        network_cache_key = f"network_{primary_address[:10]}_{blockchain}"
+        network_cache_path = self._cache_put(
+            self._net_cache, "network-cache", network_cache_key, network
+        )
+
+        # Return just metadata to avoid bloating context
+        return {
+            "network_cache_key": network_cache_key,
+            "network_cache_path": network_cache_path,
+            "total_nodes": network["metadata"]["total_nodes"],
+            "total_edges": network["metadata"]["total_edges"],
+            "total_transactions": network["metadata"]["total_transactions"],
+            "primary_address": network["metadata"]["primary_address"],
+            "blockchain": network["metadata"]["blockchain"],
+            "unscreened_addresses": network["metadata"]["unscreened_addresses"],
+            "message": f"Built network graph with {network['metadata']['total_nodes']} nodes and {network['metadata']['total_edges']} edges. Use network_cache_key '{network_cache_key}' for visualization."
+        }
+
+    def _handle_get_incident_data(self, tool_input: Dict[str, Any]) -> Dict:
+        """Load an incident from the datastore and make it the current incident."""
+        incident_id = tool_input.get("incident_id")
+        result = self._memoized(
+            "get_incident_data", tool_input,
+            lambda: self.data_retrieval.get_incident(incident_id)
+        )
+        # Store incident ID for caching
+        if result and "id" in result:
+            with self._state_lock:
                 self.current_incident_id = result["id"]
-            return result
-
-        elif tool_name == "fetch_address_info":
-            address = tool_input["address"]
-            blockchain = tool_input.get("blockchain", "ethereum")
-            result = self.trm_api.get_address_info(address, blockchain)
-            return result
-
-        elif tool_name == "fetch_risk_assessment":
-            address = tool_input["address"]
-            blockchain = tool_input.get("blockchain", "ethereum")
-            result = self.trm_api.get_address_risk(address, blockchain)
-            return result
-
-        elif tool_name == "fetch_transactions":
-            address = tool_input["address"]
-            blockchain = tool_input.get("blockchain", "ethereum")
-            limit = tool_input.get("limit", 10)
-            network_depth = tool_input.get("network_depth", 2)
-
-            # Create blockchain API client with caching support
-            blockchain_api = BlockchainExplorerAPI(
-                blockchain=blockchain,
-                incident_id=self.current_incident_id
-            )
+        return result
+
+    def _handle_fetch_address_info(self, tool_input: Dict[str, Any]) -> Dict:
+        """Fetch TRM address information."""
+        address = tool_input["address"]
+        blockchain = tool_input.get("blockchain", "ethereum")
+        return self._memoized(
+            "fetch_address_info", tool_input,
+            lambda: self.trm_api.get_address_info(address, blockchain)
+        )
+
+    def _handle_fetch_risk_assessment(self, tool_input: Dict[str, Any]) -> Dict:
+        """Fetch the TRM risk assessment for an address."""
+        address = tool_input["address"]
+        blockchain = tool_input.get("blockchain", "ethereum")
+        return self._memoized(
+            "fetch_risk_assessment", tool_input,
+            lambda: self.trm_api.get_address_risk(address, blockchain)
+        )
+
+    def _handle_fetch_transactions(self, tool_input: Dict[str, Any]) -> Dict:
+        """Fetch (or reuse) transactions for an address network and return a cache stub."""
+        address = tool_input["address"]
+        blockchain = tool_input.get("blockchain", "ethereum")
+        limit = tool_input.get("limit", 10)
+        network_depth = tool_input.get("network_depth", 2)
+
+        cache_key = f"{address[:10]}_{blockchain}_d{network_depth}_l{limit}"
+
+        # Reuse transactions already fetched for this incident
+        transactions = self._cache_get(
+            self._tx_cache, "transaction-cache", cache_key, on_load=_intern_addresses
+        )
+        if transactions is not None:
+            cache_path = self._cache_path("transaction-cache")
+        else:
+            blockchain_api = self._get_explorer(blockchain)
 
             # Use network fetching if depth > 1, otherwise simple fetch
             if network_depth > 1:
@@ -220,112 +600,69 @@ class BlockchainIncidentAgent:
             else:
                 transactions = blockchain_api.get_all_transactions(address, limit=limit)
 
-            # Store transactions in a cache file to avoid context bloat
-            import os
-            import json
-            cache_dir = f"transaction-cache/{self.current_incident_id}"
-            os.makedirs(cache_dir, exist_ok=True)
-
-            cache_key = f"{address[:10]}_{blockchain}_d{network_depth}_l{limit}"
-            cache_path = os.path.join(cache_dir, f"{cache_key}.json")
-
-            with open(cache_path, 'w') as f:
-                json.dump(transactions, f)
-
-            # Return just metadata to avoid bloating context
-            return {
-                "cache_key": cache_key,
-                "cache_path": cache_path,
-                "address": address,
-                "blockchain": blockchain,
-                "normal_tx_count": len(transactions.get("normal", [])),
-                "token_tx_count": len(transactions.get("token", [])),
-                "total_tx_count": len(transactions.get("normal", [])) + len(transactions.get("token", [])),
-                "network_depth": network_depth,
-                "limit_per_address": limit,
-                "message": f"Fetched {len(transactions.get('normal', []))} normal + {len(transactions.get('token', []))} token transactions. Use cache_key '{cache_key}' to build graph."
-            }
-
-        elif tool_name == "build_transaction_graph":
-            import os
-            import json
-
-            cache_key = tool_input["cache_key"]
-            primary_address = tool_input["primary_address"]
-            blockchain = tool_input["blockchain"]
-            addresses_to_screen = tool_input.get("addresses_to_screen", [])
-
-            # Read transactions from cache
-            cache_dir = f"transaction-cache/{self.current_incident_id}"
-            cache_path = os.path.join(cache_dir, f"{cache_key}.json")
-
-            if not os.path.exists(cache_path):
-                return {"error": f"Cache file not found: {cache_path}"}
-
-            with open(cache_path, 'r') as f:
-                transactions = json.load(f)
-
-            # Build graph
-            builder = GraphBuilder(primary_address, blockchain)
-            builder.add_transactions(transactions)
-
-            # Build network with optional TRM sanctions screening
-            network = builder.build_network(
-                trm_api=self.trm_api,
-                addresses_to_screen=addresses_to_screen
+            # Store transactions in the cache to avoid context bloat
+            cache_path = self._cache_put(
+                self._tx_cache, "transaction-cache", cache_key, transactions
             )
 
-            # Store network data in cache to avoid context bloat
-            network_cache_dir = f"network-cache/{self.current_incident_id}"
-            os.makedirs(network_cache_dir, exist_ok=True)
-
-            network_cache_key = f"network_{primary_address[:10]}_{blockchain}"
-            network_cache_path = os.path.join(network_cache_dir, f"{network_cache_key}.json")
-
-            with open(network_cache_path, 'w') as f:
-                json.dump(network, f)
-
-            # Return just metadata to avoid bloating context
-            return {
-                "network_cache_key": network_cache_key,
-                "network_cache_path": network_cache_path,
-                "total_nodes": network["metadata"]["total_nodes"],
-                "total_edges": network["metadata"]["total_edges"],
-                "total_transactions": network["metadata"]["total_transactions"],
-                "primary_address": network["metadata"]["primary_address"],
-                "blockchain": network["metadata"]["blockchain"],
-                "message": f"Built network graph with {network['metadata']['total_nodes']} nodes and {network['metadata']['total_edges']} edges. Use network_cache_key '{network_cache_key}' for visualization."
-            }
-
-        elif tool_name == "generate_visualization":
-            import os
-            import json
-
-            incident_data = tool_input["incident_data"]
-            network_cache_key = tool_input["network_cache_key"]
-            risk_data = tool_input["risk_data"]
-            output_path = tool_input["output_path"]
-            analysis_text = tool_input.get("analysis_text", "")
-
-            # Read network data from cache
-            network_cache_dir = f"network-cache/{self.current_incident_id}"
-            network_cache_path = os.path.join(network_cache_dir, f"{network_cache_key}.json")
-
-            if not os.path.exists(network_cache_path):
-                return {"error": f"Network cache file not found: {network_cache_path}"}
-
-            with open(network_cache_path, 'r') as f:
-                network_data = json.load(f)
-
-            result = self.visualizer.generate_html(
-                incident_data, network_data, risk_data, output_path, analysis_text
-            )
-            return {"status": "success", "path": result}
+        # Return just metadata to avoid bloating context
+        return {
+            "cache_key": cache_key,
+            "cache_path": cache_path,
+            "address": address,
+            "blockchain": blockchain,
+            "normal_tx_count": len(transactions.get("normal", [])),
+            "token_tx_count": len(transactions.get("token", [])),
+            "total_tx_count": len(transactions.get("normal", [])) + len(transactions.get("token", [])),
+            "network_depth": network_depth,
+            "limit_per_address": limit,
+            "message": f"Fetched {len(transactions.get('normal', []))} normal + {len(transactions.get('token', []))} token transactions. Use cache_key '{cache_key}' to build graph."
+        }
+
+    def _handle_build_transaction_graph(self, tool_input: Dict[str, Any]) -> Dict:
+        """Build (or reuse) the transaction graph for cached transactions."""
+        # Cache directories are per incident, so the incident is part of the key
+        memo_input = dict(tool_input, incident_id=self.current_incident_id)
+        return self._memoized(
+            "build_transaction_graph", memo_input,
+            lambda: self._build_transaction_graph(tool_input)
+        )
+
+    def _handle_generate_visualization(self, tool_input: Dict[str, Any]) -> Dict:
+        """Render the cached network as an HTML visualization."""
+        incident_data = tool_input["incident_data"]
+        network_cache_key = tool_input["network_cache_key"]
+        risk_data = tool_input["risk_data"]
+        output_path = tool_input["output_path"]
+        analysis_text = tool_input.get("analysis_text", "")
+
+        # Read network data from cache
+        network_data = self._cache_get(self._net_cache, "network-cache", network_cache_key)
+        if network_data is None:
+            return {"error": f"No cached network for network_cache_key: {network_cache_key}"}
+
+        result = self.visualizer.generate_html(
+            incident_data, network_data, risk_data, output_path, analysis_text
+        )
+        return {"status": "success", "path": result}
 
-        else:
+    def process_tool_call(self, tool_name: str, tool_input: Dict[str, Any]) -> Any:
+        """
+        Process a tool call from the agent.
+
+        Args:
+            tool_name: Name of the tool to call
+            tool_input: Input parameters for the tool
+
+        Returns:
+            Result of the tool execution
+        """
+        handler = self._handlers.get(tool_name)
+        if handler is None:
             return {"error": f"Unknown tool: {tool_name}"}
+        return handler(tool_input)
 
-    def run(self, user_message: str = None) -> Dict:
+    async def run(self, user_message: str = None) -> Dict:
         """
         Run the agent to analyze a blockchain incident.
 
@@ -354,6 +691,7 @@ class BlockchainIncidentAgent:
    - Creates edges representing transaction flows
    - ONLY checks TRM Sanctions API for addresses in the 'screen_for_sanctions' list
    - All other addresses default to non-sanctioned (is_sanctioned: False)
+   - unscreened_addresses counts listed addresses TRM could not screen; their status is unknown, not clean
    - Returns network_cache_key instead of full network data to avoid context bloat
 7. Fetch risk assessment for the primary address
 8. Analyze the network metadata (node count, edge count, etc.) and write a comprehensive analysis in markdown format including:
@@ -381,57 +719,83 @@ Your comprehensive analysis should include:
 - Any sanctioned entity connections (if screening was performed)
 - Key findings and recommendations"""
 
-        messages = [{"role": "user", "content": user_message}]
+        # The instructions are identical on every turn of the loop, so mark them
+        # as the end of the cached prompt prefix (tools + instructions)
+        messages = [{
+            "role": "user",
+            "content": [{
+                "type": "text",
+                "text": user_message,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }]
 
         print("Agent starting analysis...")
         print("-" * 80)
 
-        # Agent loop
-        while True:
-            response = self.anthropic_client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=16384,
-                tools=self.tools,
-                messages=messages
-            )
-
-            print(f"\nStop reason: {response.stop_reason}")
-
-            # Check if we're done
-            if response.stop_reason == "end_turn":
-                # Extract final text response
-                final_response = ""
-                for block in response.content:
-                    if hasattr(block, "text"):
-                        final_response += block.text
-
-                print("\nAgent completed analysis!")
-                print("-" * 80)
-                return {
-                    "status": "success",
-                    "response": final_response,
-                    "messages": messages
-                }
-
-            # Process tool calls
-            if response.stop_reason == "tool_use":
-                # Add assistant response to messages
-                messages.append({"role": "assistant", "content": response.content})
-
-                # Process each tool call
-                tool_results = []
-                for block in response.content:
-                    if block.type == "tool_use":
-                        tool_name = block.name
-                        tool_input = block.input
-
-                        print(f"\nTool called: {tool_name}")
-                        print(f"Input: {json.dumps(tool_input, indent=2)}")
-
-                        # Execute the tool
-                        result = self.process_tool_call(tool_name, tool_input)
-
-                        print(f"Result: {json.dumps(result, indent=2)[:500]}...")
+        # Agent loop. Tools run in worker threads so their network I/O overlaps
+        # with model generation and with each other.
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS) as executor:
+            while True:
+                # Stream the response so each tool call starts executing as soon as
+                # its input is complete, while the model is still generating the rest
+                pending: Dict[str, asyncio.Future] = {}
+                async with self.anthropic_client.messages.stream(
+                    model="claude-sonnet-4-5-20250929",
+                    max_tokens=16384,
+                    tools=self.tools,
+                    messages=messages
+                ) as stream:
+                    async for event in stream:
+                        if event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                            block = event.content_block
+                            print(f"\nTool called: {block.name}")
+                            logger.debug("Input: %s", block.input)
+                            pending[block.id] = loop.run_in_executor(
+                                executor, self.process_tool_call, block.name, block.input
+                            )
+                    response = await stream.get_final_message()
+
+                print(f"\nStop reason: {response.stop_reason}")
+                print(f"Input tokens: {response.usage.input_tokens} "
+                      f"(cache read: {response.usage.cache_read_input_tokens or 0}, "
+                      f"cache write: {response.usage.cache_creation_input_tokens or 0})")
+
+                # Check if we're done
+                if response.stop_reason == "end_turn":
+                    # Extract final text response
+                    final_response = ""
+                    for block in response.content:
+                        if hasattr(block, "text"):
+                            final_response += block.text
+
+                    print("\nAgent completed analysis!")
+                    print("-" * 80)
+                    return {
+                        "status": "success",
+                        "response": final_response,
+                        "messages": messages
+                    }
+
+                # Process tool calls
+                if response.stop_reason == "tool_use":
+                    # Add assistant response to messages
+                    messages.append({"role": "assistant", "content": response.content})
+
+                    # Await results in block order; calls were dispatched during streaming
+                    tool_use_blocks = [block for block in response.content if block.type == "tool_use"]
+                    results = await asyncio.gather(*[
+                        pending.get(block.id) or loop.run_in_executor(
+                            executor, self.process_tool_call, block.name, block.input
+                        )
+                        for block in tool_use_blocks
+                    ])
+
+                    tool_results = []
+                    for block, result in zip(tool_use_blocks, results):
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Result (%s): %s...", block.name, _truncated_json(result))
 
                         tool_results.append({
                             "type": "tool_result",
@@ -439,18 +803,21 @@ Your comprehensive analysis should include:
                             "content": json.dumps(result)
                         })
 
-                # Add tool results to messages
-                messages.append({"role": "user", "content": tool_results})
+                    # Add tool results to messages and shrink stale ones
+                    messages.append({"role": "user", "content": tool_results})
+                    _compact_tool_results(messages)
 
-            else:
-                print(f"\nUnexpected stop reason: {response.stop_reason}")
-                break
+                else:
+                    print(f"\nUnexpected stop reason: {response.stop_reason}")
+                    break
 
         return {"status": "error", "message": "Agent loop exited unexpectedly"}
 
 
 def main():
     """Main entry point for the agent."""
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
     print("=" * 80)
     print("Blockchain Incident Visualization Agent")
     print("=" * 80)
@@ -464,7 +831,10 @@ def main():
 
     # Initialize and run the agent
     agent = BlockchainIncidentAgent()
-    result = agent.run()
+    try:
+        result = asyncio.run(agent.run())
+    finally:
+        agent.close()
 
     # Print final result
     if result["status"] == "success":
@@ -1,18 +1,89 @@
 """Module for interacting with Moralis API for blockchain data."""
+import itertools
 import os
-import json
 import requests
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Set
+import orjson
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 load_dotenv()
 
 
+def _normalize_tx(tx: Dict) -> Dict:
+    """
+    Convert a Moralis wallet transaction to the Etherscan-like format used downstream.
+
+    Moralis already serializes block numbers, timestamps, values and gas fields
+    as strings, so they are passed through without coercion. Addresses are
+    lowercased and interned once here so downstream code can skip normalizing them.
+
+    Args:
+        tx: Transaction record from the Moralis response
+
+    Returns:
+        Normalized transaction dictionary
+    """
+    get = tx.get
+    return {
+        "blockNumber": get("block_number", ""),
+        "timeStamp": get("block_timestamp", ""),
+        "hash": get("hash", ""),
+        "from": sys.intern(get("from_address", "").lower()),
+        "to": sys.intern(to_addr.lower()) if (to_addr := get("to_address")) else "",
+        "value": get("value", "0"),
+        "gas": get("gas", "21000"),
+        "gasPrice": get("gas_price", "0"),
+        "isError": "1" if get("receipt_status") == "0" else "0",
+        "input": get("input", "0x")
+    }
+
+
+def _normalize_token_transfer(transfer: Dict) -> Dict:
+    """
+    Convert a Moralis ERC20 transfer to the Etherscan-like format used downstream.
+
+    Args:
+        transfer: Transfer record from the Moralis response
+
+    Returns:
+        Normalized token transfer dictionary
+    """
+    get = transfer.get
+    return {
+        "blockNumber": get("block_number", ""),
+        "timeStamp": get("block_timestamp", ""),
+        "hash": get("transaction_hash", ""),
+        "from": sys.intern(from_addr.lower()) if (from_addr := get("from_address")) else "",
+        "to": sys.intern(to_addr.lower()) if (to_addr := get("to_address")) else "",
+        "value": get("value", "0"),
+        # A crawl sees only a handful of distinct tokens, so share one string per name
+        "tokenName": sys.intern(get("token_name") or "UNKNOWN"),
+        "tokenSymbol": sys.intern(get("token_symbol") or "UNK"),
+        "tokenDecimal": get("token_decimals", "18"),
+        "contractAddress": sys.intern(contract_addr.lower()) if (contract_addr := get("address")) else "",
+        "gas": "65000",
+        "gasPrice": "0"
+    }
+
+
 class BlockchainExplorerAPI:
     """Client for Moralis Web3 API with local caching."""
 
-    def __init__(self, blockchain: str = "ethereum", api_key: Optional[str] = None, incident_id: Optional[str] = None):
+    def __init__(
+        self,
+        blockchain: str = "ethereum",
+        api_key: Optional[str] = None,
+        incident_id: Optional[str] = None,
+        max_concurrency: int = 10,
+        requests_per_second: float = 25.0
+    ):
         """
         Initialize the Moralis API client.
 
@@ -20,11 +91,22 @@ class BlockchainExplorerAPI:
             blockchain: The blockchain to query ("ethereum" or "bsc")
             api_key: Moralis API key (defaults to MORALIS_API_KEY env var)
             incident_id: Incident ID for cache directory organization
+            max_concurrency: Maximum number of addresses fetched in parallel during network crawls
+            requests_per_second: Maximum rate of Moralis requests across all threads
         """
         self.blockchain = blockchain
         self.api_key = api_key or os.getenv('MORALIS_API_KEY')
         self.base_url = "https://deep-index.moralis.io/api/v2.2"
         self.incident_id = incident_id
+        self.max_concurrency = max_concurrency
+
+        # Rate limiting shared by all crawl threads
+        self._min_request_interval = 1.0 / requests_per_second
+        self._next_request_time = 0.0
+        self._rate_lock = threading.Lock()
+
+        # In-memory tier over the disk cache, keyed by (lowercased address, transaction type)
+        self._memory_cache: Dict[tuple, List[Dict]] = {}
 
         # Setup cache directory
         if self.incident_id:
@@ -45,6 +127,29 @@ class BlockchainExplorerAPI:
             "accept": "application/json"
         }
 
+        # Shared session keeps connections to Moralis alive across requests,
+        # with one pooled connection per crawl thread and backoff on rate limits
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+        pool_size = max(32, max_concurrency)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("https://", adapter)
+
+    def _throttle(self) -> None:
+        """Block until the next request slot is available under the rate limit."""
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_time - now
+            self._next_request_time = max(now, self._next_request_time) + self._min_request_interval
+
+        if wait > 0:
+            time.sleep(wait)
+
     def _get_cache_path(self, address: str, transaction_type: str) -> Optional[str]:
         """
         Get the cache file path for an address and transaction type.
@@ -65,7 +170,7 @@ class BlockchainExplorerAPI:
 
     def _read_cache(self, address: str, transaction_type: str) -> Optional[List[Dict]]:
         """
-        Read cached response for an address.
+        Read cached response for an address, from memory if it was already loaded.
 
         Args:
             address: Blockchain address
@@ -75,12 +180,26 @@ class BlockchainExplorerAPI:
             Cached transaction list, or None if not cached
         """
         cache_path = self._get_cache_path(address, transaction_type)
-        if not cache_path or not os.path.exists(cache_path):
+        if not cache_path:
             return None
 
+        key = (address.lower(), transaction_type)
+        cached = self._memory_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            with open(cache_path, 'r') as f:
-                return json.load(f)
+            # One open and one sized read, then a single parse of the raw bytes
+            fd = os.open(cache_path, os.O_RDONLY)
+            try:
+                buf = os.read(fd, os.fstat(fd).st_size)
+            finally:
+                os.close(fd)
+            data = orjson.loads(buf)
+            self._memory_cache[key] = data
+            return data
+        except FileNotFoundError:
+            return None
         except Exception as e:
             print(f"Warning: Error reading cache for {address}: {e}")
             return None
@@ -98,11 +217,20 @@ class BlockchainExplorerAPI:
         if not cache_path:
             return
 
+        self._memory_cache[(address.lower(), transaction_type)] = data
+
+        # Write to a private temp file and publish it atomically, so an interrupted
+        # write never leaves a truncated cache file behind
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data))
+            os.replace(tmp_path, cache_path)
         except Exception as e:
             print(f"Warning: Error writing cache for {address}: {e}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     def get_normal_transactions(self, address: str, startblock: int = 0, endblock: int = 99999999) -> List[Dict]:
         """
@@ -135,33 +263,20 @@ class BlockchainExplorerAPI:
         }
 
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            self._throttle()
+            response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # Convert Moralis format to Etherscan-like format for compatibility
-            transactions = []
-            for tx in data.get("result", []):
-                to_addr = tx.get("to_address")
-                transactions.append({
-                    "blockNumber": str(tx.get("block_number", "")),
-                    "timeStamp": str(tx.get("block_timestamp", "")),
-                    "hash": tx.get("hash", ""),
-                    "from": tx.get("from_address", "").lower(),
-                    "to": to_addr.lower() if to_addr else "",
-                    "value": str(tx.get("value", "0")),
-                    "gas": str(tx.get("gas", "21000")),
-                    "gasPrice": str(tx.get("gas_price", "0")),
-                    "isError": "1" if tx.get("receipt_status") == "0" else "0",
-                    "input": tx.get("input", "0x")
-                })
+            transactions = [_normalize_tx(tx) for tx in data.get("result", ())]
 
             # Write to cache
             self._write_cache(address, "normal", transactions)
 
             return transactions
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error fetching transactions from Moralis: {e}")
             return self._get_mock_transactions(address)
 
@@ -196,37 +311,20 @@ class BlockchainExplorerAPI:
         }
 
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            self._throttle()
+            response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # Convert Moralis format to Etherscan-like format for compatibility
-            transfers = []
-            for transfer in data.get("result", []):
-                to_addr = transfer.get("to_address")
-                from_addr = transfer.get("from_address")
-                contract_addr = transfer.get("address")
-                transfers.append({
-                    "blockNumber": str(transfer.get("block_number", "")),
-                    "timeStamp": str(transfer.get("block_timestamp", "")),
-                    "hash": transfer.get("transaction_hash", ""),
-                    "from": from_addr.lower() if from_addr else "",
-                    "to": to_addr.lower() if to_addr else "",
-                    "value": str(transfer.get("value", "0")),
-                    "tokenName": transfer.get("token_name", "UNKNOWN"),
-                    "tokenSymbol": transfer.get("token_symbol", "UNK"),
-                    "tokenDecimal": str(transfer.get("token_decimals", "18")),
-                    "contractAddress": contract_addr.lower() if contract_addr else "",
-                    "gas": "65000",
-                    "gasPrice": "0"
-                })
+            transfers = [_normalize_token_transfer(transfer) for transfer in data.get("result", ())]
 
             # Write to cache
             self._write_cache(address, "token", transfers)
 
             return transfers
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error fetching token transfers from Moralis: {e}")
             return self._get_mock_token_transfers(address)
 
@@ -244,7 +342,6 @@ class BlockchainExplorerAPI:
         print(f"Fetching transactions for {address} on {self.blockchain} via Moralis...")
 
         normal_txs = self.get_normal_transactions(address)
-        time.sleep(0.2)  # Rate limiting
         token_txs = self.get_token_transfers(address)
 
         # Limit results
@@ -253,6 +350,36 @@ class BlockchainExplorerAPI:
             "token": token_txs[:limit] if token_txs else []
         }
 
+    def get_all_transactions_batch(self, addresses: List[str], limit: int = 100) -> Dict[str, Dict]:
+        """
+        Get normal transactions and token transfers for many addresses at once.
+
+        Moralis has no batch endpoint for wallet history, so the normal and token
+        requests for every address are issued concurrently (bounded by
+        max_concurrency and the shared rate limit) and demultiplexed per address.
+
+        Args:
+            addresses: The blockchain addresses
+            limit: Maximum number of transactions to return per type
+
+        Returns:
+            Dictionary mapping each address to its 'normal' and 'token' transaction lists
+        """
+        for address in addresses:
+            print(f"Fetching transactions for {address} on {self.blockchain} via Moralis...")
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            normal_results = executor.map(self.get_normal_transactions, addresses)
+            token_results = executor.map(self.get_token_transfers, addresses)
+
+            return {
+                address: {
+                    "normal": normal_txs[:limit] if normal_txs else [],
+                    "token": token_txs[:limit] if token_txs else []
+                }
+                for address, normal_txs, token_txs in zip(addresses, normal_results, token_results)
+            }
+
     def get_network_transactions(self, primary_address: str, depth: int = 2, limit_per_address: int = 20) -> Dict:
         """
         Recursively fetch transactions for a network up to specified depth.
@@ -271,56 +398,77 @@ class BlockchainExplorerAPI:
 
         # Track processed addresses to avoid duplicates
         processed_addresses: Set[str] = set()
+        # Addresses already queued at some depth, so each is enqueued only once
+        enqueued: Set[str] = {primary_address.lower()}
         all_normal_txs = []
         all_token_txs = []
 
         # Queue: (address, current_depth)
-        queue = [(primary_address.lower(), 0)]
-
-        while queue:
-            current_address, current_depth = queue.pop(0)
+        queue = deque([(primary_address.lower(), 0)])
 
-            # Skip if already processed or depth exceeded
-            if current_address in processed_addresses or current_depth >= depth:
-                continue
+        # Local aliases keep attribute lookups out of the per-transaction loops
+        popleft = queue.popleft
+        append = queue.append
+        mark_processed = processed_addresses.add
+        extend_normal = all_normal_txs.extend
+        extend_token = all_token_txs.extend
+        fetch_batch = self.get_all_transactions_batch
 
-            processed_addresses.add(current_address)
-            print(f"Depth {current_depth + 1}/{depth}: Fetching {current_address[:10]}... ({len(processed_addresses)} addresses processed)")
-
-            # Fetch transactions for current address
-            txs = self.get_all_transactions(current_address, limit=limit_per_address)
-
-            # Add to combined results
-            all_normal_txs.extend(txs.get("normal", []))
-            all_token_txs.extend(txs.get("token", []))
-
-            # If we haven't reached max depth, add connected addresses to queue
-            if current_depth < depth - 1:
-                connected_addresses = set()
+        while queue:
+            # Drain every queued address at the current depth so they can be fetched concurrently
+            current_depth = queue[0][1]
+            level = []
+            while queue and queue[0][1] == current_depth:
+                current_address, _ = popleft()
 
-                # Extract addresses from normal transactions
-                for tx in txs.get("normal", []):
-                    from_addr = tx.get("from", "").lower()
-                    to_addr = tx.get("to", "").lower()
-                    if from_addr and from_addr != current_address and from_addr not in processed_addresses:
-                        connected_addresses.add(from_addr)
-                    if to_addr and to_addr != current_address and to_addr not in processed_addresses:
-                        connected_addresses.add(to_addr)
+                # Skip if already processed or depth exceeded
+                if current_address in processed_addresses or current_depth >= depth:
+                    continue
 
-                # Extract addresses from token transfers
-                for tx in txs.get("token", []):
-                    from_addr = tx.get("from", "").lower()
-                    to_addr = tx.get("to", "").lower()
-                    if from_addr and from_addr != current_address and from_addr not in processed_addresses:
-                        connected_addresses.add(from_addr)
-                    if to_addr and to_addr != current_address and to_addr not in processed_addresses:
-                        connected_addresses.add(to_addr)
+                mark_processed(current_address)
+                level.append(current_address)
 
-                # Add connected addresses to queue for next depth
-                for addr in connected_addresses:
-                    queue.append((addr, current_depth + 1))
+            if not level:
+                continue
 
-                print(f"  -> Found {len(connected_addresses)} new addresses at depth {current_depth + 2}")
+            print(f"Depth {current_depth + 1}/{depth}: Fetching {len(level)} addresses ({len(processed_addresses)} addresses processed)")
+
+            # Fetch transactions for every address at this depth in one batch
+            level_txs = fetch_batch(level, limit=limit_per_address)
+            next_depth = current_depth + 1
+            expand = current_depth < depth - 1
+
+            for current_address in level:
+                txs = level_txs[current_address]
+                normal_txs = txs.get("normal", [])
+                token_txs = txs.get("token", [])
+
+                # Add to combined results
+                extend_normal(normal_txs)
+                extend_token(token_txs)
+
+                # If we haven't reached max depth, add connected addresses to queue
+                if expand:
+                    connected_addresses = set()
+                    add_connected = connected_addresses.add
+
+                    # Extract addresses from normal transactions and token transfers;
+                    # they are already lowercased by the Moralis normalizers
+                    for tx in itertools.chain(normal_txs, token_txs):
+                        get = tx.get
+                        from_addr = get("from", "")
+                        to_addr = get("to", "")
+                        if from_addr and from_addr != current_address and from_addr not in enqueued:
+                            add_connected(from_addr)
+                        if to_addr and to_addr != current_address and to_addr not in enqueued:
+                            add_connected(to_addr)
+
+                    # Add connected addresses to queue for next depth
+                    for addr in connected_addresses:
+                        append((addr, next_depth))
+                    enqueued.update(connected_addresses)
+
+                    print(f"  -> Found {len(connected_addresses)} new addresses at depth {current_depth + 2}")
 
         print(f"\n{'='*80}")
         print(f"Network fetch complete: {len(processed_addresses)} addresses, {len(all_normal_txs)} normal txs, {len(all_token_txs)} token txs")
@@ -335,20 +483,25 @@ class BlockchainExplorerAPI:
         """Generate mock normal transaction data."""
         import random
 
+        randbytes = random.randbytes
+        rand = random.random
+        randint = random.randint
+        address = address.lower()
+
         mock_txs = []
         for i in range(10):
-            is_incoming = random.random() > 0.5
-            other_address = f"0x{''.join([format(random.randint(0, 15), 'x') for _ in range(40)])}"
+            is_incoming = rand() > 0.5
+            other_address = "0x" + randbytes(20).hex()
 
             mock_txs.append({
                 "blockNumber": str(20000000 + i * 1000),
                 "timeStamp": str(1700000000 + i * 86400),
-                "hash": f"0x{''.join([format(random.randint(0, 15), 'x') for _ in range(64)])}",
-                "from": other_address if is_incoming else address.lower(),
-                "to": address.lower() if is_incoming else other_address,
-                "value": str(random.randint(1000000000000000, 10000000000000000000)),
+                "hash": "0x" + randbytes(32).hex(),
+                "from": other_address if is_incoming else address,
+                "to": address if is_incoming else other_address,
+                "value": str(randint(1000000000000000, 10000000000000000000)),
                 "gas": "21000",
-                "gasPrice": str(random.randint(1000000000, 50000000000)),
+                "gasPrice": str(randint(1000000000, 50000000000)),
                 "isError": "0",
                 "input": "0x"
             })
@@ -359,28 +512,34 @@ class BlockchainExplorerAPI:
         """Generate mock token transfer data."""
         import random
 
-        token_names = ["USDT", "USDC", "DAI", "WETH", "BUSD"]
+        randbytes = random.randbytes
+        rand = random.random
+        randint = random.randint
+        randrange = random.randrange
+        address = address.lower()
+
+        token_names = ("USDT", "USDC", "DAI", "WETH", "BUSD")
         mock_transfers = []
 
         for i in range(5):
-            is_incoming = random.random() > 0.5
-            other_address = f"0x{''.join([format(random.randint(0, 15), 'x') for _ in range(40)])}"
-            contract_address = f"0x{''.join([format(random.randint(0, 15), 'x') for _ in range(40)])}"
-            token_name = random.choice(token_names)
+            is_incoming = rand() > 0.5
+            other_address = "0x" + randbytes(20).hex()
+            contract_address = "0x" + randbytes(20).hex()
+            token_name = token_names[randrange(len(token_names))]
 
             mock_transfers.append({
                 "blockNumber": str(20000000 + i * 1000),
                 "timeStamp": str(1700000000 + i * 86400),
-                "hash": f"0x{''.join([format(random.randint(0, 15), 'x') for _ in range(64)])}",
-                "from": other_address if is_incoming else address.lower(),
-                "to": address.lower() if is_incoming else other_address,
-                "value": str(random.randint(1000000000000000000, 1000000000000000000000)),
+                "hash": "0x" + randbytes(32).hex(),
+                "from": other_address if is_incoming else address,
+                "to": address if is_incoming else other_address,
+                "value": str(randint(1000000000000000000, 1000000000000000000000)),
                 "tokenName": token_name,
                 "tokenSymbol": token_name,
                 "tokenDecimal": "18",
                 "contractAddress": contract_address,
                 "gas": "65000",
-                "gasPrice": str(random.randint(1000000000, 50000000000))
+                "gasPrice": str(randint(1000000000, 50000000000))
             })
 
         return mock_transfers
@@ -1,7 +1,11 @@
 """Module for building graph structures from blockchain transaction data."""
-from typing import Dict, List, Set
+import sys
+from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
 
+# Powers of ten for the common token decimals, so scaling avoids a pow per transaction
+_SCALE = {d: 10 ** d for d in (0, 6, 8, 9, 18)}
+
 
 class GraphBuilder:
     """Builds graph nodes and edges from blockchain transactions."""
@@ -14,10 +18,12 @@ class GraphBuilder:
             primary_address: The primary address being analyzed
             blockchain: The blockchain network
         """
-        self.primary_address = primary_address.lower()
+        self.primary_address = sys.intern(primary_address.lower())
         self.blockchain = blockchain
-        self.nodes = {}
-        self.edges = []
+        self._native_symbol = 'BNB' if blockchain == 'bsc' else 'ETH'
+        # Running per-(source, target) totals, aggregated as transactions are processed
+        self._edge_agg: Dict[Tuple[str, str], Dict] = {}
+        self.transaction_count = 0
         self.address_volumes = defaultdict(float)
         self.address_tx_counts = defaultdict(int)
 
@@ -26,15 +32,18 @@ class GraphBuilder:
         Process transactions and build graph structure.
 
         Args:
-            transactions: Dictionary with 'normal' and 'token' transaction lists
+            transactions: Dictionary with 'normal' and 'token' transaction lists; addresses
+                are lowercased here unless already lowercase, as BlockchainExplorerAPI returns them
         """
+        process = self._process_transaction
+
         # Process normal transactions
         for tx in transactions.get('normal', []):
-            self._process_transaction(tx, is_token=False)
+            process(tx, False)
 
         # Process token transfers
         for tx in transactions.get('token', []):
-            self._process_transaction(tx, is_token=True)
+            process(tx, True)
 
     def _process_transaction(self, tx: Dict, is_token: bool = False):
         """
@@ -44,63 +53,59 @@ class GraphBuilder:
             tx: Transaction dictionary
             is_token: Whether this is a token transfer
         """
-        from_addr = tx.get('from', '').lower()
-        to_addr = tx.get('to', '').lower()
-        tx_hash = tx.get('hash', '')
-        value = float(tx.get('value', 0))
+        get = tx.get
+        from_addr = get('from', '')
+        to_addr = get('to', '')
+        tx_hash = get('hash', '')
 
         # Skip if missing critical data
         if not from_addr or not to_addr or not tx_hash:
             return
 
+        # Explorer data is already lowercase (and interned), so only other sources pay
+        # for normalizing; mixed-case copies of one address must not become two nodes
+        if not from_addr.islower():
+            from_addr = sys.intern(from_addr.lower())
+        if not to_addr.islower():
+            to_addr = sys.intern(to_addr.lower())
+
         # Skip self-transfers
         if from_addr == to_addr:
             return
 
         # Convert value based on decimals
         if is_token:
-            decimals = int(tx.get('tokenDecimal', 18))
-            value = value / (10 ** decimals)
-            token_symbol = tx.get('tokenSymbol', 'TOKEN')
+            decimals = int(get('tokenDecimal', 18))
+            token_symbol = get('tokenSymbol', 'TOKEN')
         else:
-            value = value / (10 ** 18)  # Convert wei to native token
-            token_symbol = 'BNB' if self.blockchain == 'bsc' else 'ETH'
-
-        # Track volumes
+            decimals = 18  # Convert wei to native token
+            token_symbol = self._native_symbol
+
+        # Integer division of the raw amount is exact for values beyond 2**53
+        raw_value = get('value', 0)
+        scale = _SCALE.get(decimals) or 10 ** decimals
+        try:
+            value = int(raw_value) / scale
+        except (TypeError, ValueError):
+            value = float(raw_value) / scale
+
+        # Track volumes; every address seen here becomes a node in build_network
         self.address_volumes[from_addr] += value
         self.address_volumes[to_addr] += value
         self.address_tx_counts[from_addr] += 1
         self.address_tx_counts[to_addr] += 1
 
-        # Add nodes
-        if from_addr not in self.nodes:
-            self.nodes[from_addr] = {
-                "address": from_addr,
-                "type": "source" if from_addr == self.primary_address else "connected"
-            }
-
-        if to_addr not in self.nodes:
-            self.nodes[to_addr] = {
-                "address": to_addr,
-                "type": "source" if to_addr == self.primary_address else "connected"
-            }
-
-        # Create edge
-        edge = {
-            "source": from_addr,
-            "target": to_addr,
-            "tx_hash": tx_hash,
-            "volume": value,
-            "token": token_symbol,
-            "timestamp": tx.get('timeStamp', ''),
-            "blockNumber": tx.get('blockNumber', ''),
-            "is_token": is_token
-        }
-
-        if is_token:
-            edge["contractAddress"] = tx.get('contractAddress', '')
-
-        self.edges.append(edge)
+        # Aggregate into the edge between this address pair
+        key = (from_addr, to_addr)
+        agg = self._edge_agg.get(key)
+        if agg is None:
+            agg = self._edge_agg[key] = {"volume": 0.0, "count": 0, "tokens": {}}
+        agg["volume"] += value
+        agg["count"] += 1
+        # Plain dict rather than Counter: Counter() construction is pure Python
+        tokens = agg["tokens"]
+        tokens[token_symbol] = tokens.get(token_symbol, 0) + 1
+        self.transaction_count += 1
 
     def aggregate_edges(self) -> List[Dict]:
         """
@@ -109,83 +114,80 @@ class GraphBuilder:
         Returns:
             List of aggregated edge dictionaries
         """
-        # Group edges by source-target pair
-        edge_groups = defaultdict(list)
-
-        for edge in self.edges:
-            key = (edge['source'], edge['target'])
-            edge_groups[key].append(edge)
-
-        # Aggregate each group
         aggregated_edges = []
-        for (source, target), group in edge_groups.items():
-            total_volume = sum(e['volume'] for e in group)
-            tx_count = len(group)
-
-            # Determine primary token (most common)
-            tokens = [e['token'] for e in group]
-            primary_token = max(set(tokens), key=tokens.count)
-
+        for (source, target), agg in self._edge_agg.items():
             aggregated_edges.append({
                 "source": source,
                 "target": target,
-                "volume": total_volume,
-                "transaction_count": tx_count,
-                "token": primary_token,
+                "volume": agg["volume"],
+                "transaction_count": agg["count"],
+                # Primary token is the most common one on this edge
+                "token": max(agg["tokens"], key=agg["tokens"].get),
                 "direction": "outbound" if source == self.primary_address else "inbound"
             })
 
         return aggregated_edges
 
-    def build_network(self, trm_api=None, addresses_to_screen: List[str] = None) -> Dict:
+    def build_network(
+        self,
+        trm_api=None,
+        addresses_to_screen: List[str] = None,
+        screen_results: Optional[Dict[str, Dict]] = None
+    ) -> Dict:
         """
         Build the complete network structure with optional sanctions screening.
 
         Args:
             trm_api: Optional TRM API client for sanctions screening
             addresses_to_screen: List of addresses to check against TRM Sanctions API (default: empty)
+            screen_results: Optional pre-fetched screening results keyed by lowercased address;
+                when omitted, addresses are screened with a single batch request via trm_api
 
         Returns:
             Dictionary with nodes, edges, and metadata
         """
-        if addresses_to_screen is None:
-            addresses_to_screen = []
+        # Normalize addresses to lowercase once, as a set for O(1) membership per node
+        screen_set = frozenset(addr.lower() for addr in (addresses_to_screen or ()))
 
-        # Normalize addresses to lowercase for comparison
-        addresses_to_screen = [addr.lower() for addr in addresses_to_screen]
+        if screen_results is None:
+            screen_results = {}
+            if trm_api and screen_set:
+                screen_results = trm_api.screen_addresses_batch(list(screen_set), self.blockchain)
         # Get aggregated edges
         aggregated_edges = self.aggregate_edges()
 
         # Build node list with enrichment
         node_list = []
-        for address, node_data in self.nodes.items():
+        unscreened = 0
+        for address, tx_count in self.address_tx_counts.items():
+            volume = self.address_volumes[address]
             node = {
                 "address": address,
-                "type": node_data["type"],
+                "type": "source" if address == self.primary_address else "connected",
                 "entity": "Primary Address" if address == self.primary_address else f"Address {address[:8]}...",
-                "transaction_count": self.address_tx_counts[address],
-                "total_volume": self.address_volumes[address]
+                "transaction_count": tx_count,
+                "total_volume": volume
             }
 
             # Add sanctions status only if address is in screening list
-            if trm_api and address in addresses_to_screen:
-                try:
-                    screening = trm_api.screen_address(address, self.blockchain)
-                    node["is_sanctioned"] = screening.get("isSanctioned", False)
-                    node["entity"] = screening.get("name", node["entity"])
-                except Exception as e:
-                    print(f"Warning: Could not screen address {address[:10]}...: {e}")
-                    node["is_sanctioned"] = False
+            screening = screen_results.get(address) if address in screen_set else None
+            if screening is not None:
+                node["is_sanctioned"] = screening.get("isSanctioned", False)
+                node["entity"] = screening.get("name", node["entity"])
+                # Mock fallbacks (failed or unmatched screening) are flagged screened: False
+                node["screened"] = screening.get("screened", True)
+                unscreened += not node["screened"]
             else:
                 # Default to non-sanctioned if not in screening list
                 node["is_sanctioned"] = False
+                node["screened"] = False
 
             # Detect if address is likely a contract vs EOA
             # Heuristic: contracts often have more interactions and higher volumes
             # This is imperfect without actual blockchain queries
             is_likely_contract = (
-                self.address_tx_counts[address] > 5 or
-                self.address_volumes[address] > 100
+                tx_count > 5 or
+                volume > 100
             )
             node["is_contract"] = is_likely_contract
 
@@ -199,7 +201,9 @@ class GraphBuilder:
                 "blockchain": self.blockchain,
                 "total_nodes": len(node_list),
                 "total_edges": len(aggregated_edges),
-                "total_transactions": len(self.edges)
+                "total_transactions": self.transaction_count,
+                # Requested addresses whose sanctions status is unknown rather than clean
+                "unscreened_addresses": unscreened
             }
         }
 
@@ -1,28 +1,138 @@
 """Module for interacting with TRM Labs BlockInt API."""
+import atexit
+import logging
 import os
 import requests
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import orjson
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Maximum number of addresses sent in one sanctions screening request
+SCREENING_BATCH_SIZE = 100
+
+# (connect, read) timeouts in seconds: fail fast on a dead host, allow a slower response.
+# The connect value sits just above a multiple of the 3 s TCP retransmit window.
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Consecutive failures before screening short-circuits to mock data, and for how long
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN_SECONDS = 30
+
+# Where the process-wide default client persists screening results
+DEFAULT_SCREENING_CACHE_FILE = os.path.join("trm-cache", "screening.json")
+
+# Reasons recorded on mock screening data, which stands in for a missing result
+_NO_API_KEY_ERROR = "No TRM API key configured"
+_CIRCUIT_OPEN_ERROR = "TRM screening paused after repeated failures"
+_NO_RESULT_ERROR = "No screening result returned by TRM"
+
+# The only screening fields read by callers; everything else is dropped on ingest
+_SCREENING_FIELDS = ("address", "isSanctioned", "name", "category", "labels", "riskIndicators")
+
+
+def _project_screening(result: Dict) -> Dict:
+    """
+    Reduce a TRM screening result to the fields callers use.
+
+    Absent fields stay absent so callers' own defaults still apply.
+
+    Args:
+        result: Screening result from the TRM response
+
+    Returns:
+        Screening result containing only the used fields
+    """
+    return {field: result[field] for field in _SCREENING_FIELDS if field in result}
 
 
 class TRMLabsAPI:
     """Client for TRM Labs BlockInt API."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    # Map blockchain names to TRM chain identifiers
+    _CHAIN_MAP = {
+        "ethereum": "ethereum",
+        "bsc": "bsc",
+        "binance-smart-chain": "bsc"
+    }
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = 8,
+        cache_ttl_seconds: float = 3600,
+        cache_file: Optional[str] = None,
+        warmup: bool = True
+    ):
         """
         Initialize the TRM Labs API client.
 
         Args:
             api_key: TRM Labs API key (defaults to TRM_API_KEY env var)
+            max_concurrency: Maximum number of screening requests in flight at once
+            cache_ttl_seconds: How long a screening result is reused before re-screening
+            cache_file: Optional JSON file used to persist screening results across runs
+            warmup: Open the TLS connection to TRM in the background when an API key is set
         """
+        if api_key is None:
+            # Only touch the .env file when the key has to come from the environment
+            load_dotenv()
         self.api_key = api_key or os.getenv('TRM_API_KEY')
+        self.max_concurrency = max_concurrency
+
+        # Screening results keyed by (TRM chain, lowercased address) -> (screened at, result)
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_file = cache_file
+        self._cache: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        if self.cache_file:
+            self._load_cache()
+            atexit.register(self.save_cache)
+
+        # Circuit breaker: stop calling TRM for a while after repeated failures
+        self._consecutive_failures = 0
+        self._circuit_open_until = 0.0
+        self._circuit_lock = threading.Lock()
         self.sanctions_url = "https://api.trmlabs.com/public/v1/sanctions/screening"
-        self.headers = {
-            "Authorization": f"Basic {self.api_key}" if self.api_key else "",
-            "Content-Type": "application/json"
-        }
+
+        # Headers are attached to the session once; no Authorization header without a key
+        self.headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            self.headers["Authorization"] = f"Basic {self.api_key}"
+
+        # Shared session reuses the TLS connection to TRM across screening calls
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Screening is a read-only query, so retrying the POST is safe
+        retries = Retry(
+            total=3,
+            connect=2,
+            read=2,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"])
+        )
+        # All traffic goes to one host, so one pool holding a connection per concurrent batch
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retries)
+        self.session.mount("https://", adapter)
+
+        if warmup and self.api_key:
+            threading.Thread(target=self._warmup, name="trm-warmup", daemon=True).start()
+
+    def _warmup(self) -> None:
+        """Establish a pooled TLS connection to TRM so the first screening skips the handshake."""
+        try:
+            self.session.head("https://api.trmlabs.com/", timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            logger.debug("TRM connection warmup failed: %s", e)
 
     def screen_address(self, address: str, chain: str = "ethereum") -> Dict:
         """
@@ -36,16 +146,16 @@ class TRMLabsAPI:
             Dictionary containing screening results with risk data
         """
         if not self.api_key:
-            print(f"Warning: No TRM API key. Using mock sanctions data for {address[:10]}...")
-            return self._get_mock_sanctions_data(address)
-
-        # Map chain names to TRM format
-        chain_map = {
-            "ethereum": "ethereum",
-            "bsc": "bsc",
-            "binance-smart-chain": "bsc"
-        }
-        trm_chain = chain_map.get(chain.lower(), chain.lower())
+            logger.warning("No TRM API key. Using mock sanctions data for %s...", address[:10])
+            return self._get_mock_sanctions_data(address, _NO_API_KEY_ERROR)
+
+        trm_chain = self._to_trm_chain(chain)
+        cached = self._cache_get(trm_chain, address)
+        if cached is not None:
+            return cached
+
+        if self._circuit_open():
+            return self._get_mock_sanctions_data(address, _CIRCUIT_OPEN_ERROR)
 
         payload = [{
             "address": address,
@@ -53,23 +163,261 @@ class TRMLabsAPI:
         }]
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.sanctions_url,
-                json=payload,
-                headers=self.headers,
-                timeout=30
+                data=orjson.dumps(payload),
+                timeout=REQUEST_TIMEOUT
             )
             response.raise_for_status()
-            results = response.json()
+            results = orjson.loads(response.content)
+            self._record_success()
 
             if results and len(results) > 0:
-                return results[0]
+                result = _project_screening(results[0])
+                self._cache_put(trm_chain, address, result)
+                return result
             else:
-                return self._get_mock_sanctions_data(address)
+                return self._get_mock_sanctions_data(address, _NO_RESULT_ERROR)
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error screening address: {e}")
-            return self._get_mock_sanctions_data(address)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.error("Error screening address %s: %s", address, e)
+            self._record_failure()
+            return self._get_mock_sanctions_data(address, f"Screening request failed: {e}")
+
+    def screen_addresses_batch(self, addresses: List[str], chain: str = "ethereum") -> Dict[str, Dict]:
+        """
+        Screen many addresses with as few TRM Sanctions API requests as possible.
+
+        Addresses are sent in chunks of SCREENING_BATCH_SIZE, and the chunks are
+        posted concurrently (up to max_concurrency at a time).
+
+        Args:
+            addresses: The blockchain addresses to screen
+            chain: The blockchain network
+
+        Returns:
+            Dictionary mapping lowercased address to its screening result
+        """
+        if not addresses:
+            return {}
+
+        if not self.api_key:
+            logger.warning("No TRM API key. Using mock sanctions data for %d addresses...", len(addresses))
+            return {
+                address.lower(): self._get_mock_sanctions_data(address, _NO_API_KEY_ERROR)
+                for address in addresses
+            }
+
+        trm_chain = self._to_trm_chain(chain)
+
+        # Serve previously screened addresses from the cache; only screen the rest
+        results = {}
+        to_screen = []
+        for address in addresses:
+            cached = self._cache_get(trm_chain, address)
+            if cached is not None:
+                results[address.lower()] = cached
+            else:
+                to_screen.append(address)
+
+        chunks = [
+            to_screen[i:i + SCREENING_BATCH_SIZE]
+            for i in range(0, len(to_screen), SCREENING_BATCH_SIZE)
+        ]
+
+        if len(chunks) == 1:
+            results.update(self._screen_chunk(chunks[0], trm_chain))
+        elif chunks:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as executor:
+                for chunk_results in executor.map(lambda chunk: self._screen_chunk(chunk, trm_chain), chunks):
+                    results.update(chunk_results)
+
+        # Fall back to unscreened mock data for anything the API did not return
+        for address in addresses:
+            results.setdefault(address.lower(), self._get_mock_sanctions_data(address, _NO_RESULT_ERROR))
+
+        return results
+
+    def _screen_chunk(self, addresses: List[str], trm_chain: str) -> Dict[str, Dict]:
+        """
+        Send one sanctions screening request for a chunk of addresses.
+
+        Errors are reported and swallowed so a failed chunk does not affect the others;
+        its addresses get unscreened mock data carrying the error.
+
+        Args:
+            addresses: The blockchain addresses in this chunk
+            trm_chain: TRM chain identifier
+
+        Returns:
+            Dictionary mapping lowercased address to its screening result
+        """
+        if self._circuit_open():
+            return {
+                address.lower(): self._get_mock_sanctions_data(address, _CIRCUIT_OPEN_ERROR)
+                for address in addresses
+            }
+
+        payload = [{"address": address, "chain": trm_chain} for address in addresses]
+
+        results = {}
+        try:
+            response = self.session.post(
+                self.sanctions_url,
+                data=orjson.dumps(payload),
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            response_results = orjson.loads(response.content) or []
+            self._record_success()
+
+            # Match results by their address field; when it is missing or not one we sent
+            # (a changed format), fall back to the request order if the counts line up
+            requested = {address.lower() for address in addresses}
+            in_request_order = len(response_results) == len(addresses)
+            for i, result in enumerate(response_results):
+                address = (result.get("address") or "").lower()
+                if address not in requested:
+                    if not in_request_order:
+                        continue
+                    address = addresses[i].lower()
+                results[address] = _project_screening(result)
+
+            unmatched = len(requested) - len(results)
+            if unmatched:
+                logger.warning(
+                    "TRM returned no matching screening result for %d of %d addresses; "
+                    "marking them unscreened", unmatched, len(requested)
+                )
+
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.error("Error screening %d addresses: %s", len(addresses), e)
+            self._record_failure()
+            return {
+                address.lower(): self._get_mock_sanctions_data(address, f"Screening request failed: {e}")
+                for address in addresses
+            }
+
+        for address, result in results.items():
+            self._cache_put(trm_chain, address, result)
+
+        return results
+
+    def _circuit_open(self) -> bool:
+        """Return True while screening requests are short-circuited after repeated failures."""
+        with self._circuit_lock:
+            return time.monotonic() < self._circuit_open_until
+
+    def _record_success(self) -> None:
+        """Close the circuit after a successful screening request."""
+        with self._circuit_lock:
+            self._consecutive_failures = 0
+
+    def _record_failure(self) -> None:
+        """
+        Count a failed screening request, opening the circuit at the threshold.
+
+        The counter is only reset by a success, so once the cooldown expires a
+        single failed probe re-opens the circuit immediately.
+        """
+        with self._circuit_lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self._circuit_open_until = time.monotonic() + CIRCUIT_COOLDOWN_SECONDS
+                logger.warning(
+                    "TRM screening failed %d times in a row; using mock data for %ds",
+                    self._consecutive_failures, CIRCUIT_COOLDOWN_SECONDS
+                )
+
+    def _cache_get(self, trm_chain: str, address: str) -> Optional[Dict]:
+        """
+        Look up an unexpired screening result.
+
+        Args:
+            trm_chain: TRM chain identifier
+            address: The blockchain address
+
+        Returns:
+            Cached screening result, or None if missing or expired
+        """
+        key = (trm_chain, address.lower())
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.time() - entry[0] < self.cache_ttl_seconds:
+                self._cache_hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._cache[key]
+            self._cache_misses += 1
+            return None
+
+    def _cache_put(self, trm_chain: str, address: str, result: Dict) -> None:
+        """Store a screening result returned by the API (mock data is never cached)."""
+        with self._cache_lock:
+            self._cache[(trm_chain, address.lower())] = (time.time(), result)
+
+    def clear_cache(self) -> None:
+        """Drop all cached screening results and reset the hit/miss counters."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_hits = 0
+            self._cache_misses = 0
+
+    def cache_stats(self) -> Dict:
+        """
+        Report screening cache usage.
+
+        Returns:
+            Dictionary with the number of cached entries, hits and misses
+        """
+        with self._cache_lock:
+            return {
+                "entries": len(self._cache),
+                "hits": self._cache_hits,
+                "misses": self._cache_misses
+            }
+
+    def _load_cache(self) -> None:
+        """Load unexpired screening results persisted by a previous run."""
+        try:
+            with open(self.cache_file, 'rb') as f:
+                entries = orjson.loads(f.read())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Error reading TRM screening cache: %s", e)
+            return
+
+        now = time.time()
+        for trm_chain, address, screened_at, result in entries:
+            if now - screened_at < self.cache_ttl_seconds:
+                self._cache[(trm_chain, address)] = (screened_at, result)
+
+    def save_cache(self) -> None:
+        """Persist unexpired screening results to cache_file, if one is configured."""
+        if not self.cache_file:
+            return
+
+        now = time.time()
+        with self._cache_lock:
+            entries = [
+                [trm_chain, address, screened_at, result]
+                for (trm_chain, address), (screened_at, result) in self._cache.items()
+                if now - screened_at < self.cache_ttl_seconds
+            ]
+
+        if not entries and not os.path.exists(self.cache_file):
+            return
+
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            with open(self.cache_file, 'wb') as f:
+                f.write(orjson.dumps(entries))
+        except (OSError, orjson.JSONEncodeError) as e:
+            logger.warning("Error writing TRM screening cache: %s", e)
 
     def get_address_info(self, address: str, blockchain: str = "ethereum") -> Dict:
         """
@@ -82,18 +430,40 @@ class TRMLabsAPI:
         Returns:
             Dictionary containing address information
         """
+        return self.get_address_full(address, blockchain)[0]
+
+    def get_address_full(self, address: str, blockchain: str = "ethereum") -> Tuple[Dict, Dict]:
+        """
+        Get both address information and risk assessment from one screening.
+
+        Args:
+            address: The blockchain address
+            blockchain: The blockchain network (default: ethereum)
+
+        Returns:
+            Tuple of (address information, risk assessment) dictionaries
+        """
         screening_result = self.screen_address(address, blockchain)
+        return (
+            self._to_address_info(address, blockchain, screening_result),
+            self._to_address_risk(address, screening_result)
+        )
+
+    def get_address_infos(self, addresses: List[str], blockchain: str = "ethereum") -> Dict[str, Dict]:
+        """
+        Get information about many addresses with batched sanctions screening.
+
+        Args:
+            addresses: The blockchain addresses
+            blockchain: The blockchain network (default: ethereum)
 
-        # Transform sanctions data to address info format
+        Returns:
+            Dictionary mapping each address to its address information
+        """
+        screening_results = self.screen_addresses_batch(addresses, blockchain)
         return {
-            "address": address,
-            "blockchain": blockchain,
-            "entity": {
-                "name": screening_result.get("name", "Unknown Entity"),
-                "category": screening_result.get("category", "unknown")
-            },
-            "labels": screening_result.get("labels", []),
-            "is_sanctioned": screening_result.get("isSanctioned", False)
+            address: self._to_address_info(address, blockchain, screening_results[address.lower()])
+            for address in addresses
         }
 
     def get_address_risk(self, address: str, blockchain: str = "ethereum") -> Dict:
@@ -107,24 +477,90 @@ class TRMLabsAPI:
         Returns:
             Dictionary containing sanctions status (no risk score without API)
         """
-        screening_result = self.screen_address(address, blockchain)
-        is_sanctioned = screening_result.get("isSanctioned", False)
+        return self.get_address_full(address, blockchain)[1]
+
+    def get_address_risks(self, addresses: List[str], blockchain: str = "ethereum") -> Dict[str, Dict]:
+        """
+        Get risk assessments for many addresses with batched sanctions screening.
 
+        Args:
+            addresses: The blockchain addresses
+            blockchain: The blockchain network
+
+        Returns:
+            Dictionary mapping each address to its sanctions status
+        """
+        screening_results = self.screen_addresses_batch(addresses, blockchain)
         return {
+            address: self._to_address_risk(address, screening_results[address.lower()])
+            for address in addresses
+        }
+
+    def _to_address_info(self, address: str, blockchain: str, screening_result: Dict) -> Dict:
+        """Transform a sanctions screening result to the address info format."""
+        info = {
+            "address": address,
+            "blockchain": blockchain,
+            "entity": {
+                "name": screening_result.get("name", "Unknown Entity"),
+                "category": screening_result.get("category", "unknown")
+            },
+            "labels": screening_result.get("labels", []),
+            "is_sanctioned": screening_result.get("isSanctioned", False)
+        }
+        return self._with_screening_status(info, screening_result)
+
+    def _to_address_risk(self, address: str, screening_result: Dict) -> Dict:
+        """Transform a sanctions screening result to the risk assessment format."""
+        risk = {
             "address": address,
-            "is_sanctioned": is_sanctioned,
+            "is_sanctioned": screening_result.get("isSanctioned", False),
             "risk_indicators": screening_result.get("riskIndicators", [])
         }
+        return self._with_screening_status(risk, screening_result)
 
-    def _get_mock_sanctions_data(self, address: str) -> Dict:
+    def _with_screening_status(self, output: Dict, screening_result: Dict) -> Dict:
+        """
+        Add whether the address was actually screened, so "clean" and "unknown" differ.
+
+        Args:
+            output: Address info or risk assessment being built
+            screening_result: Screening result it was built from
+
+        Returns:
+            The output, with screened and, for mock data, screening_error set
+        """
+        output["screened"] = screening_result.get("screened", True)
+        if not output["screened"]:
+            output["screening_error"] = screening_result.get("error", _NO_RESULT_ERROR)
+        return output
+
+    def _to_trm_chain(self, chain: str) -> str:
+        """
+        Map a blockchain name to the chain identifier used by TRM.
+
+        Args:
+            chain: The blockchain network
+
+        Returns:
+            TRM chain identifier
+        """
+        if not chain.islower():
+            chain = chain.lower()
+        return self._CHAIN_MAP.get(chain, chain)
+
+    def _get_mock_sanctions_data(self, address: str, error: str = _NO_RESULT_ERROR) -> Dict:
         """
         Generate mock sanctions screening data.
         Without TRM API, we cannot determine actual sanctions status.
-        Always returns non-sanctioned for mock data.
+        Always returns non-sanctioned for mock data, flagged with screened: False
+        and the reason in error, so callers can tell it apart from a clean result.
         """
         return {
             "address": address,
             "chain": "unknown",
+            "screened": False,
+            "error": error,
             "isSanctioned": False,  # Cannot determine without API
             "name": "Unknown Entity",
             "category": "unknown",
@@ -133,10 +569,30 @@ class TRMLabsAPI:
         }
 
 
+_default_client: Optional[TRMLabsAPI] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> TRMLabsAPI:
+    """
+    Get the process-wide TRM client, creating it on first use.
+
+    Sharing one client means every caller reuses the same connection pool
+    and screening cache.
+
+    Returns:
+        The shared TRMLabsAPI instance
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = TRMLabsAPI(cache_file=DEFAULT_SCREENING_CACHE_FILE)
+        return _default_client
+
 
 if __name__ == "__main__":
     # Test the TRM API client
-    client = TRMLabsAPI()
+    client = get_default_client()
     address = "0x0000000000000000000000000000000000000000"
 
     print("Fetching address info...")
@@ -145,8 +601,5 @@ if __name__ == "__main__":
 
     print("\nFetching risk data...")
     risk = client.get_address_risk(address)
-    print(f"Risk Score: {risk.get('risk_score', 'N/A')}")
-
-    print("\nFetching network data...")
-    network = client.get_address_network(address)
-    print(f"Network nodes: {network.get('metadata', {}).get('total_nodes', 0)}")
+    print(f"Sanctioned: {risk.get('is_sanctioned', False)}")
+    print(f"Risk indicators: {len(risk.get('risk_indicators', []))}")
@@ -1,260 +1,328 @@
 """Module for generating three.js visualizations of blockchain incidents."""
-import json
-from typing import Dict, List
+import gzip
+import hashlib
+import re
+import threading
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Union
 import os
 
+import orjson
+from markdown_it import MarkdownIt
 
-class IncidentVisualizer:
-    """Creates three.js force-directed graph visualizations of blockchain incidents."""
+# Write buffer for the output file; large enough that the JSON payload goes out in few syscalls
+WRITE_BUFFER_SIZE = 1 << 20
 
-    def __init__(self):
-        """Initialize the visualizer."""
-        pass
+# Nodes/edges serialized per piece when streaming the JSON arrays
+JSON_CHUNK_SIZE = 1000
+
+# Compression level for the precompressed .gz copy written next to the HTML
+GZIP_COMPRESS_LEVEL = 6
 
-    def generate_html(
-        self,
-        incident_data: Dict,
-        network_data: Dict,
-        risk_data: Dict,
-        output_path: str,
-        analysis_text: str = ""
-    ) -> str:
-        """
-        Generate an HTML file with embedded three.js visualization.
+# Last line of every generated page: a hash of everything before it, so a regenerated page
+# can be compared with the existing file by reading only its tail
+_HASH_TRAILER = '\n<!-- blake2b:{} -->\n'
 
-        Args:
-            incident_data: Incident information
-            network_data: Network graph data with nodes and edges
-            risk_data: Risk assessment data
-            output_path: Path where the HTML file will be saved
-            analysis_text: Comprehensive analysis text in markdown format
+# three.js r128 and its OrbitControls from CDNs, deferred so they download without blocking parsing
+_CDN_SCRIPT_TAGS = (
+    '    <script defer src="https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.min.js"></script>\n'
+    '    <script defer src="https://unpkg.com/three@0.128.0/examples/js/controls/OrbitControls.js"></script>'
+)
 
-        Returns:
-            Path to the generated HTML file
-        """
-        # Prepare data for visualization
-        nodes = network_data.get('nodes', [])
-        edges = network_data.get('edges', [])
+# Files inlined from IncidentVisualizer's three_js_path, in load order
+_THREE_JS_FILES = ('three.min.js', 'OrbitControls.js')
 
-        # Generate the HTML content
-        html_content = self._create_html_template(
-            incident_data=incident_data,
-            nodes=nodes,
-            edges=edges,
-            risk_data=risk_data,
-            analysis_text=analysis_text
-        )
+# CommonMark renderer with the GFM tables and strikethrough that marked.js supported. Like
+# GFM, CommonMark starts a list right after a paragraph line ("Summary:\n- a") and nests
+# lists indented by two spaces, which is how the agent's analysis is usually written.
+# Raw HTML passes through, as it did with marked.
+_MARKDOWN = MarkdownIt('commonmark', {'html': True}).enable(['table', 'strikethrough'])
 
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+# Shown in place of the analysis when the agent did not provide one
+_NO_ANALYSIS_HTML = (
+    '<p style="opacity: 0.7;"><em>No detailed analysis available. '
+    'The agent did not provide comprehensive analysis text.</em></p>'
+)
 
-        # Write the HTML file
-        with open(output_path, 'w') as f:
-            f.write(html_content)
+# Node colors keyed by (is_sanctioned, is_contract): red shades for sanctioned addresses,
+# blue for the rest, with the lighter shade for contracts
+_NODE_COLORS = {
+    (True, False): 0xcc0000,   # Sanctioned EOA: dark red
+    (True, True): 0xff6666,    # Sanctioned contract: light red
+    (False, False): 0x0066cc,  # Non-sanctioned EOA: dark blue
+    (False, True): 0x66b3ff,   # Non-sanctioned contract: light blue
+}
 
-        return output_path
 
-    def _create_html_template(
-        self,
-        incident_data: Dict,
-        nodes: List[Dict],
-        edges: List[Dict],
-        risk_data: Dict,
-        analysis_text: str = ""
-    ) -> str:
-        """
-        Create the HTML template with embedded three.js visualization.
+def _dumps(obj) -> str:
+    """
+    Serialize data for embedding in an inline <script> block.
 
-        Args:
-            incident_data: Incident information
-            nodes: List of network nodes
-            edges: List of network edges
-            risk_data: Risk assessment data
-            analysis_text: Comprehensive analysis text in markdown format
+    Args:
+        obj: JSON-serializable value
 
-        Returns:
-            Complete HTML content as a string
-        """
-        # Handle edge cases where nodes/edges might not be lists
-        if not isinstance(nodes, list):
-            nodes = []
-        if not isinstance(edges, list):
-            edges = []
+    Returns:
+        JSON text with "</" escaped so embedded strings cannot close the script tag
+    """
+    return orjson.dumps(obj).decode().replace('</', '<\\/')
 
-        # Calculate counts explicitly
-        node_count = len(nodes)
-        edge_count = len(edges)
 
-        # Convert data to JSON for embedding
-        nodes_json = json.dumps(nodes)
-        edges_json = json.dumps(edges)
+def _node_color(node: Dict) -> int:
+    """
+    Get a node's display color from its sanctions status and address type.
 
-        # Escape analysis text for JavaScript template literal
-        escaped_analysis = analysis_text.replace('`', '\\`').replace('$', '\\$') if analysis_text else ""
+    Args:
+        node: Network node
 
-        # Get risk color based on score
-        def get_risk_color(risk_score):
-            if risk_score > 70:
-                return '#ff0000'  # High risk: red
-            elif risk_score > 30:
-                return '#ffa500'  # Medium risk: orange
-            else:
-                return '#00ff00'  # Low risk: green
+    Returns:
+        RGB color as an integer (e.g. 0xcc0000)
+    """
+    return _NODE_COLORS[bool(node.get('is_sanctioned')), bool(node.get('is_contract'))]
 
-        incident_id = incident_data.get('id', 'unknown')
-        incident_name = incident_data.get('name', 'Unknown Incident')
-        incident_desc = incident_data.get('description', 'No description available')
 
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Blockchain Incident Visualization - {incident_name}</title>
-    <style>
-        * {{
+def _inline_script_tags(three_js_path: str) -> str:
+    """
+    Build inline <script> tags from locally hosted three.js files.
+
+    Args:
+        three_js_path: Directory containing three.min.js and OrbitControls.js
+
+    Returns:
+        Script tags with the file contents embedded, in load order
+    """
+    tags = []
+    for name in _THREE_JS_FILES:
+        with open(os.path.join(three_js_path, name), encoding='utf-8') as f:
+            # Keep any "</script" in the source from closing the tag early
+            source = f.read().replace('</script', '<\\/script')
+        tags.append(f'    <script>\n{source}\n    </script>')
+    return '\n'.join(tags)
+
+
+def _read_tail(path: str, size: int) -> bytes:
+    """
+    Read the last bytes of a file.
+
+    Args:
+        path: File path
+        size: Number of bytes to read from the end
+
+    Returns:
+        The file's last size bytes, or b'' if it is missing or shorter than that
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(-size, os.SEEK_END)
+            return f.read()
+    except OSError:
+        return b''
+
+
+class _Utf8Tee:
+    """Text writer that encodes each string once and passes the bytes to several sinks."""
+
+    def __init__(self, sinks: List[Callable[[bytes], object]]):
+        """
+        Initialize the writer.
+
+        Args:
+            sinks: Callables that each receive the full output, such as file.write or hash.update
+        """
+        self._sinks = sinks
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        for sink in self._sinks:
+            sink(data)
+
+    def writelines(self, lines: Iterable[str]):
+        for text in lines:
+            self.write(text)
+
+
+def _iter_json_array(items: List, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Serialize a list as a JSON array in pieces, so large arrays are never held as one string.
+
+    Args:
+        items: List of JSON-serializable values
+        chunk_size: Number of items encoded per piece
+
+    Yields:
+        Consecutive fragments of the script-safe JSON array text
+    """
+    yield '['
+    for start in range(0, len(items), chunk_size):
+        chunk = _dumps(items[start:start + chunk_size])[1:-1]
+        yield chunk if start == 0 else ',' + chunk
+    yield ']'
+
+
+def _write_template(f: TextIO, values: Dict[str, Union[str, Iterable[str]]]):
+    """
+    Write the page template to a file, filling its placeholders.
+
+    Args:
+        f: Writable text file
+        values: Replacement keyed by placeholder name (without underscores); either
+            a string or an iterable of string fragments written in order
+    """
+    write = f.write
+    for i, part in enumerate(_TEMPLATE_PARTS):
+        if not i % 2:
+            write(part)
+            continue
+        value = values[part]
+        if isinstance(value, str):
+            write(value)
+        else:
+            f.writelines(value)
+
+
+# Page stylesheet, inlined into the template once at import
+_CSS = """        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
 
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             background: #0a0e27;
             color: #ffffff;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 1800px;
             margin: 0 auto;
             padding: 20px;
-        }}
+        }
 
-        header {{
+        header {
             text-align: center;
             padding: 30px 0;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             border-radius: 10px;
             margin-bottom: 30px;
-        }}
+        }
 
-        h1 {{
+        h1 {
             font-size: 2.5em;
             margin-bottom: 10px;
-        }}
+        }
 
-        .incident-id {{
+        .incident-id {
             font-size: 1.2em;
             opacity: 0.9;
-        }}
+        }
 
-        .content {{
+        .content {
             display: grid;
             grid-template-columns: 1fr 400px;
             gap: 20px;
             margin-bottom: 30px;
-        }}
+        }
 
-        #visualization {{
+        #visualization {
             background: #1a1f3a;
             border-radius: 10px;
             height: 700px;
             position: relative;
             overflow: hidden;
-        }}
+        }
 
-        .sidebar {{
+        .sidebar {
             background: #1a1f3a;
             border-radius: 10px;
             padding: 20px;
             overflow-y: auto;
             max-height: 700px;
-        }}
+        }
 
-        .section {{
+        .section {
             margin-bottom: 25px;
-        }}
+        }
 
-        .section h2 {{
+        .section h2 {
             font-size: 1.3em;
             margin-bottom: 15px;
             color: #667eea;
             border-bottom: 2px solid #667eea;
             padding-bottom: 8px;
-        }}
+        }
 
-        .stat {{
+        .stat {
             display: flex;
             justify-content: space-between;
             padding: 8px 0;
             border-bottom: 1px solid #2a2f4a;
-        }}
+        }
 
-        .stat:last-child {{
+        .stat:last-child {
             border-bottom: none;
-        }}
+        }
 
-        .stat-label {{
+        .stat-label {
             font-weight: 600;
             opacity: 0.8;
-        }}
+        }
 
-        .stat-value {{
+        .stat-value {
             font-weight: 700;
-        }}
+        }
 
-        .risk-high {{
+        .risk-high {
             color: #ff4444;
-        }}
+        }
 
-        .risk-medium {{
+        .risk-medium {
             color: #ffa500;
-        }}
+        }
 
-        .risk-low {{
+        .risk-low {
             color: #44ff44;
-        }}
+        }
 
-        .legend {{
+        .legend {
             background: #0f1229;
             padding: 15px;
             border-radius: 8px;
             margin-top: 15px;
-        }}
+        }
 
-        .legend-item {{
+        .legend-item {
             display: flex;
             align-items: center;
             margin: 8px 0;
-        }}
+        }
 
-        .legend-color {{
+        .legend-color {
             width: 20px;
             height: 20px;
             border-radius: 50%;
             margin-right: 10px;
-        }}
+        }
 
-        .technical-summary {{
+        .technical-summary {
             background: #1a1f3a;
             border-radius: 10px;
             padding: 30px;
             margin-top: 20px;
-        }}
+        }
 
-        .technical-summary h2 {{
+        .technical-summary h2 {
             font-size: 1.8em;
             margin-bottom: 20px;
             color: #667eea;
-        }}
+        }
 
-        .technical-summary p {{
+        .technical-summary p {
             line-height: 1.8;
             margin-bottom: 15px;
             opacity: 0.9;
-        }}
+        }
 
-        .controls {{
+        .controls {
             position: absolute;
             top: 10px;
             left: 10px;
@@ -262,9 +330,9 @@ class IncidentVisualizer:
             background: rgba(26, 31, 58, 0.9);
             padding: 10px;
             border-radius: 5px;
-        }}
+        }
 
-        .controls button {{
+        .controls button {
             background: #667eea;
             color: white;
             border: none;
@@ -273,13 +341,13 @@ class IncidentVisualizer:
             border-radius: 5px;
             cursor: pointer;
             font-size: 0.9em;
-        }}
+        }
 
-        .controls button:hover {{
+        .controls button:hover {
             background: #764ba2;
-        }}
+        }
 
-        .node-info {{
+        .node-info {
             position: absolute;
             bottom: 10px;
             left: 10px;
@@ -288,104 +356,115 @@ class IncidentVisualizer:
             border-radius: 8px;
             max-width: 300px;
             display: none;
-        }}
+        }
 
-        .node-info.active {{
+        .node-info.active {
             display: block;
-        }}
+        }
 
         /* Markdown content styling */
-        #analysis-content h1, #analysis-content h2, #analysis-content h3 {{
+        #analysis-content h1, #analysis-content h2, #analysis-content h3 {
             color: #667eea;
             margin-top: 25px;
             margin-bottom: 15px;
-        }}
+        }
 
-        #analysis-content h1 {{
+        #analysis-content h1 {
             font-size: 1.6em;
             border-bottom: 2px solid #667eea;
             padding-bottom: 10px;
-        }}
+        }
 
-        #analysis-content h2 {{
+        #analysis-content h2 {
             font-size: 1.4em;
-        }}
+        }
 
-        #analysis-content h3 {{
+        #analysis-content h3 {
             font-size: 1.2em;
-        }}
+        }
 
-        #analysis-content ul, #analysis-content ol {{
+        #analysis-content ul, #analysis-content ol {
             margin-left: 20px;
             margin-bottom: 15px;
-        }}
+        }
 
-        #analysis-content li {{
+        #analysis-content li {
             margin-bottom: 8px;
-        }}
+        }
 
-        #analysis-content p {{
+        #analysis-content p {
             margin-bottom: 15px;
-        }}
+        }
 
-        #analysis-content code {{
+        #analysis-content code {
             background: #0f1229;
             padding: 2px 6px;
             border-radius: 3px;
             font-family: 'Courier New', monospace;
-        }}
+        }
 
-        #analysis-content pre {{
+        #analysis-content pre {
             background: #0f1229;
             padding: 15px;
             border-radius: 5px;
             overflow-x: auto;
             margin-bottom: 15px;
-        }}
+        }
 
-        #analysis-content table {{
+        #analysis-content table {
             width: 100%;
             border-collapse: collapse;
             margin-bottom: 20px;
-        }}
+        }
 
-        #analysis-content th, #analysis-content td {{
+        #analysis-content th, #analysis-content td {
             border: 1px solid #2a2f4a;
             padding: 10px;
             text-align: left;
-        }}
+        }
 
-        #analysis-content th {{
+        #analysis-content th {
             background: #0f1229;
             font-weight: bold;
-        }}
+        }
 
-        #analysis-content blockquote {{
+        #analysis-content blockquote {
             border-left: 4px solid #667eea;
             padding-left: 15px;
             margin-left: 0;
             opacity: 0.8;
-        }}
+        }
 
-        #analysis-content strong {{
+        #analysis-content strong {
             color: #8899ff;
-        }}
+        }
 
-        #analysis-content a {{
+        #analysis-content a {
             color: #667eea;
             text-decoration: none;
-        }}
+        }
 
-        #analysis-content a:hover {{
+        #analysis-content a:hover {
             text-decoration: underline;
-        }}
-    </style>
+        }
+"""
+
+# Static page shell; only the __NAME__ placeholders vary between calls
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Blockchain Incident Visualization - __INCIDENT_NAME__</title>
+    <style>
+__STYLE__    </style>
+__THREE_SCRIPTS__
 </head>
 <body>
     <div class="container">
         <header>
-            <h1>{incident_name}</h1>
-            <div class="incident-id">Incident ID: {incident_id}</div>
+            <h1>__INCIDENT_NAME__</h1>
+            <div class="incident-id">Incident ID: __INCIDENT_ID__</div>
         </header>
 
         <div class="content">
@@ -402,11 +481,11 @@ class IncidentVisualizer:
                     <h2>Network Statistics</h2>
                     <div class="stat">
                         <span class="stat-label">Total Nodes:</span>
-                        <span class="stat-value">{node_count}</span>
+                        <span class="stat-value">__NODE_COUNT__</span>
                     </div>
                     <div class="stat">
                         <span class="stat-label">Total Edges:</span>
-                        <span class="stat-value">{edge_count}</span>
+                        <span class="stat-value">__EDGE_COUNT__</span>
                     </div>
                     <div class="stat">
                         <span class="stat-label">Network Depth:</span>
@@ -418,7 +497,7 @@ class IncidentVisualizer:
                     <h2>Sanctions Status</h2>
                     <div class="stat">
                         <span class="stat-label">Primary Address:</span>
-                        <span class="stat-value {'risk-high' if risk_data.get('is_sanctioned') else ''}">{{'SANCTIONED' if risk_data.get('is_sanctioned') else 'Not Sanctioned'}}</span>
+                        <span class="stat-value __SANCTION_CLASS__">__SANCTION_STATUS__</span>
                     </div>
                 </div>
 
@@ -466,8 +545,8 @@ class IncidentVisualizer:
 
         <div class="technical-summary">
             <h2>Technical Summary</h2>
-            <p><strong>Description:</strong> {incident_desc}</p>
-            <p><strong>Blockchain:</strong> {incident_data.get('blockchain', 'Unknown')}</p>
+            <p><strong>Description:</strong> __INCIDENT_DESC__</p>
+            <p><strong>Blockchain:</strong> __BLOCKCHAIN__</p>
             <p><strong>Analysis:</strong> This visualization represents the transaction network associated with the incident.
             Each node represents a blockchain address or entity, with color indicating risk level. Edge thickness
             represents transaction volume between entities. The graph uses a force-directed layout to show relationships
@@ -478,327 +557,694 @@ class IncidentVisualizer:
         <div class="analysis-section" style="background: #1a1f3a; border-radius: 10px; padding: 30px; margin-top: 20px;">
             <h2 style="font-size: 1.8em; margin-bottom: 20px; color: #667eea;">Comprehensive Analysis</h2>
             <div id="analysis-content" style="line-height: 1.8; opacity: 0.95;">
-                <!-- Analysis will be rendered here by marked.js -->
+__ANALYSIS_HTML__
             </div>
         </div>
     </div>
 
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.min.js"></script>
-    <script src="https://unpkg.com/three@0.128.0/examples/js/controls/OrbitControls.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/marked/marked.min.js"></script>
-    <script>
-        // Render markdown analysis
-        const analysisText = `{escaped_analysis}`;
-        if (analysisText && analysisText.trim()) {{
-            document.getElementById('analysis-content').innerHTML = marked.parse(analysisText);
-        }} else {{
-            document.getElementById('analysis-content').innerHTML = '<p style="opacity: 0.7;"><em>No detailed analysis available. The agent did not provide comprehensive analysis text.</em></p>';
-        }}
-    </script>
     <script>
         // Parse data
-        const nodes = {nodes_json};
-        const edges = {edges_json};
-
-        // Three.js setup
-        const container = document.getElementById('visualization');
-        const scene = new THREE.Scene();
-        scene.background = new THREE.Color(0x0a0e27);
-
-        const camera = new THREE.PerspectiveCamera(
-            75,
-            container.clientWidth / container.clientHeight,
-            0.1,
-            1000
-        );
-        camera.position.z = 30;
-
-        const renderer = new THREE.WebGLRenderer({{ antialias: true }});
-        renderer.setSize(container.clientWidth, container.clientHeight);
-        container.appendChild(renderer.domElement);
-
-        // Orbit controls
-        const controls = new THREE.OrbitControls(camera, renderer.domElement);
-        controls.enableDamping = true;
-        controls.dampingFactor = 0.05;
-
-        // Lighting
-        const ambientLight = new THREE.AmbientLight(0xffffff, 0.6);
-        scene.add(ambientLight);
-
-        const pointLight = new THREE.PointLight(0xffffff, 0.8);
-        pointLight.position.set(10, 10, 10);
-        scene.add(pointLight);
-
-        // Create node meshes
-        const nodeMeshes = [];
-        const nodePositions = new Map();
-
-        // Function to get color based on sanctions status and address type
-        function getNodeColor(node) {{
-            const is_sanctioned = node.is_sanctioned || false;
-            const is_contract = node.is_contract || false;
-
-            if (is_sanctioned) {{
-                // Sanctioned: Red (dark for EOA, light for contract)
-                return is_contract ? 0xff6666 : 0xcc0000;  // Light red : Dark red
-            }} else {{
-                // Non-sanctioned: Blue (dark for EOA, light for contract)
-                return is_contract ? 0x66b3ff : 0x0066cc;  // Light blue : Dark blue
-            }}
-        }}
-
-        // Create nodes in a circle initially (smaller radius for better initial layout)
-        const radius = Math.min(8, 4 + nodes.length * 0.3);  // Scale with node count
-        nodes.forEach((node, index) => {{
-            const angle = (index / nodes.length) * Math.PI * 2;
-            const x = Math.cos(angle) * radius;
-            const y = Math.sin(angle) * radius;
-            const z = (Math.random() - 0.5) * 3;
-
-            const nodeColor = getNodeColor(node);
-            const geometry = new THREE.SphereGeometry(0.5, 32, 32);
-            const material = new THREE.MeshPhongMaterial({{
-                color: nodeColor,
-                emissive: nodeColor,
+        const nodes = __NODES_JSON__;
+        const edges = __EDGES_JSON__;
+
+        // Everything else runs once the DOM is parsed, by which point the deferred three.js
+        // scripts have executed
+        document.addEventListener('DOMContentLoaded', () => {
+            // Three.js setup
+            const container = document.getElementById('visualization');
+            const scene = new THREE.Scene();
+            scene.background = new THREE.Color(0x0a0e27);
+
+            const camera = new THREE.PerspectiveCamera(
+                75,
+                container.clientWidth / container.clientHeight,
+                0.1,
+                1000
+            );
+            camera.position.z = 30;
+
+            const renderer = new THREE.WebGLRenderer({ antialias: true });
+            renderer.setSize(container.clientWidth, container.clientHeight);
+            container.appendChild(renderer.domElement);
+
+            // Orbit controls
+            const controls = new THREE.OrbitControls(camera, renderer.domElement);
+            controls.enableDamping = true;
+            controls.dampingFactor = 0.05;
+
+            // Lighting
+            const ambientLight = new THREE.AmbientLight(0xffffff, 0.6);
+            scene.add(ambientLight);
+
+            const pointLight = new THREE.PointLight(0xffffff, 0.8);
+            pointLight.position.set(10, 10, 10);
+            scene.add(pointLight);
+
+            // Scratch objects reused every frame instead of allocating in the hot loops
+            const _dir = new THREE.Vector3();
+            const _up = new THREE.Vector3(0, 1, 0);
+            const _pos = new THREE.Vector3();
+            const _scale = new THREE.Vector3();
+            const _quat = new THREE.Quaternion();
+            const _matrix = new THREE.Matrix4();
+
+            // Node positions as a flat typed array, x/y/z interleaved per node index
+            const nodeCount = nodes.length;
+            const pos = new Float32Array(3 * nodeCount);
+            const nodeIndex = new Map();
+
+            // All spheres share one geometry and material in a single instanced mesh, drawn in one call.
+            // Each node's colour is its instance colour.
+            const nodeMaterial = new THREE.MeshPhongMaterial({
+                emissive: 0xffffff,
                 emissiveIntensity: 0.2
-            }});
-
-            const sphere = new THREE.Mesh(geometry, material);
-            sphere.position.set(x, y, z);
-            sphere.userData = node;
-
-            scene.add(sphere);
-            nodeMeshes.push(sphere);
-            nodePositions.set(node.address, sphere.position);
-        }});
-
-        // Create edges with proper sizing and direction arrows
-        const edgeMeshes = [];
-        const minVolume = Math.min(...edges.map(e => e.volume));
-        const maxVolume = Math.max(...edges.map(e => e.volume));
-
-        edges.forEach(edge => {{
-            const sourcePos = nodePositions.get(edge.source);
-            const targetPos = nodePositions.get(edge.target);
-
-            if (sourcePos && targetPos) {{
-                // Calculate edge thickness based on volume (0.05 to 0.3)
-                const volumeRatio = (edge.volume - minVolume) / (maxVolume - minVolume || 1);
-                const thickness = 0.05 + volumeRatio * 0.25;
-
-                // Create cylinder for the edge
-                const direction = new THREE.Vector3().subVectors(targetPos, sourcePos);
-                const distance = direction.length();
-                const edgeMaterial = new THREE.MeshPhongMaterial({{
-                    color: 0x667eea,
-                    opacity: 0.7,
-                    transparent: true,
-                    shininess: 30
-                }});
-
-                const cylinderGeometry = new THREE.CylinderGeometry(thickness, thickness, distance, 8);
-                const cylinder = new THREE.Mesh(cylinderGeometry, edgeMaterial);
-
-                // Position and orient the cylinder
-                cylinder.position.copy(sourcePos).add(direction.multiplyScalar(0.5));
-                cylinder.quaternion.setFromUnitVectors(
-                    new THREE.Vector3(0, 1, 0),
-                    direction.clone().normalize()
-                );
-
-                scene.add(cylinder);
-
-                // Create arrow head (cone) at the target to show direction
-                const arrowSize = thickness * 3;
-                const coneGeometry = new THREE.ConeGeometry(arrowSize, arrowSize * 2, 8);
-                const coneMaterial = new THREE.MeshPhongMaterial({{
-                    color: 0x8899ff,
-                    opacity: 0.9,
-                    transparent: true
-                }});
-                const cone = new THREE.Mesh(coneGeometry, coneMaterial);
-
-                // Position cone at target, pointing in direction of flow
-                const arrowDirection = direction.clone().normalize();
-                const arrowPos = targetPos.clone().sub(arrowDirection.multiplyScalar(0.5 + arrowSize));
-                cone.position.copy(arrowPos);
-                cone.quaternion.setFromUnitVectors(
-                    new THREE.Vector3(0, 1, 0),
-                    arrowDirection
+            });
+            // Tint the emissive glow by the instance colour too, as the per-node materials did.
+            // vColor only exists once instance colours are set, which an empty network never does.
+            nodeMaterial.onBeforeCompile = shader => {
+                shader.fragmentShader = shader.fragmentShader.replace(
+                    'vec3 totalEmissiveRadiance = emissive;',
+                    [
+                        '#if defined( USE_INSTANCING_COLOR ) || defined( USE_COLOR )',
+                        '    vec3 totalEmissiveRadiance = emissive * vColor;',
+                        '#else',
+                        '    vec3 totalEmissiveRadiance = emissive;',
+                        '#endif'
+                    ].join('\\n')
                 );
-
-                scene.add(cone);
-
-                edgeMeshes.push({{
-                    cylinder,
-                    cone,
-                    source: sourcePos,
-                    target: targetPos,
-                    thickness
-                }});
-            }}
-        }});
-
-        // Force-directed simulation
-        let animating = true;
-
-        function applyForces() {{
-            if (!animating) return;
-
-            const repulsionStrength = 1.5;      // Reduced from 2
-            const attractionStrength = 0.08;    // Increased from 0.01 (8x stronger)
-            const desiredEdgeLength = 5;        // Target edge length
-            const springStrength = 0.02;        // Spring force to maintain edge length
-            const damping = 0.9;
-
-            nodeMeshes.forEach((node, i) => {{
-                const velocity = node.userData.velocity || new THREE.Vector3(0, 0, 0);
-
-                // Repulsion between nodes (inverse square law)
-                nodeMeshes.forEach((other, j) => {{
-                    if (i !== j) {{
-                        const diff = new THREE.Vector3().subVectors(node.position, other.position);
-                        const distance = diff.length();
-                        if (distance > 0 && distance < 20) {{  // Only repel nearby nodes
-                            const force = repulsionStrength / (distance * distance);
-                            diff.normalize().multiplyScalar(force);
-                            velocity.add(diff);
-                        }}
-                    }}
-                }});
-
-                // Spring forces along edges (Hooke's law)
-                edges.forEach(edge => {{
-                    if (edge.source === node.userData.address) {{
-                        const targetPos = nodePositions.get(edge.target);
-                        if (targetPos) {{
-                            const diff = new THREE.Vector3().subVectors(targetPos, node.position);
-                            const distance = diff.length();
-
-                            // Spring force: F = k * (distance - desiredLength)
-                            const displacement = distance - desiredEdgeLength;
-                            const force = springStrength * displacement;
-
-                            diff.normalize().multiplyScalar(force);
-                            velocity.add(diff);
-                        }}
-                    }}
-                    // Bidirectional attraction for connected nodes
-                    if (edge.target === node.userData.address) {{
-                        const sourcePos = nodePositions.get(edge.source);
-                        if (sourcePos) {{
-                            const diff = new THREE.Vector3().subVectors(sourcePos, node.position);
-                            const distance = diff.length();
-                            const displacement = distance - desiredEdgeLength;
-                            const force = springStrength * displacement;
-                            diff.normalize().multiplyScalar(force);
-                            velocity.add(diff);
-                        }}
-                    }}
-                }});
-
-                // Apply damping
-                velocity.multiplyScalar(damping);
-
-                // Update position
-                node.position.add(velocity);
-                node.userData.velocity = velocity;
-            }});
-
-            // Update edge positions (cylinders and cones)
-            edgeMeshes.forEach(edge => {{
-                // Update cylinder position and orientation
-                const direction = new THREE.Vector3().subVectors(edge.target, edge.source);
-                const distance = direction.length();
-
-                // Resize cylinder to new distance
-                edge.cylinder.scale.y = distance / edge.cylinder.geometry.parameters.height;
-
-                // Position at midpoint
-                edge.cylinder.position.copy(edge.source).add(direction.clone().multiplyScalar(0.5));
-
-                // Orient cylinder
-                edge.cylinder.quaternion.setFromUnitVectors(
-                    new THREE.Vector3(0, 1, 0),
-                    direction.clone().normalize()
-                );
-
-                // Update arrow cone position
-                const arrowDirection = direction.clone().normalize();
+            };
+            // Nodes are a few pixels across, so a coarse sphere (~330 triangles) looks the same
+            const NODE_RADIUS = 0.5;
+            const nodeMesh = new THREE.InstancedMesh(
+                new THREE.SphereGeometry(NODE_RADIUS, 16, 12), nodeMaterial, nodes.length
+            );
+            nodeMesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage);
+            const _color = new THREE.Color();
+
+            // Create nodes in a circle initially (smaller radius for better initial layout)
+            const radius = Math.min(8, 4 + nodes.length * 0.3);  // Scale with node count
+            nodes.forEach((node, index) => {
+                const angle = (index / nodes.length) * Math.PI * 2;
+                const x = Math.cos(angle) * radius;
+                const y = Math.sin(angle) * radius;
+                const z = (Math.random() - 0.5) * 3;
+
+                pos[3 * index] = x;
+                pos[3 * index + 1] = y;
+                pos[3 * index + 2] = z;
+                nodeIndex.set(node.address, index);
+
+                nodeMesh.setColorAt(index, _color.setHex(node.color));
+                nodeMesh.setMatrixAt(index, _matrix.makeTranslation(x, y, z));
+            });
+            scene.add(nodeMesh);
+
+            // Create edges with proper sizing and direction arrows
+            const edgeInstances = [];
+
+            edges.forEach(edge => {
+                const source = nodeIndex.get(edge.source);
+                const target = nodeIndex.get(edge.target);
+
+                if (source !== undefined && target !== undefined) {
+                    edgeInstances.push({
+                        source,
+                        target,
+                        thickness: edge.thickness
+                    });
+                }
+            });
+
+            // One instanced mesh for all edge cylinders and one for all arrow cones, so edges cost
+            // two draw calls in total. Unit geometries are scaled per instance.
+            const edgeMaterial = new THREE.MeshPhongMaterial({
+                color: 0x667eea,
+                opacity: 0.7,
+                transparent: true,
+                shininess: 30
+            });
+            const coneMaterial = new THREE.MeshPhongMaterial({
+                color: 0x8899ff,
+                opacity: 0.9,
+                transparent: true
+            });
+            const cylinderMesh = new THREE.InstancedMesh(
+                new THREE.CylinderGeometry(1, 1, 1, 8), edgeMaterial, edgeInstances.length
+            );
+            const coneMesh = new THREE.InstancedMesh(
+                new THREE.ConeGeometry(1, 2, 8), coneMaterial, edgeInstances.length
+            );
+            [cylinderMesh, coneMesh].forEach(mesh => {
+                mesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage);
+                scene.add(mesh);
+            });
+
+            // Position, orient and size edge i's cylinder and arrow cone from its endpoints
+            function updateEdgeInstance(i) {
+                const edge = edgeInstances[i];
+                _pos.fromArray(pos, 3 * edge.source);
+                _dir.fromArray(pos, 3 * edge.target).sub(_pos);
+                const distance = _dir.length();
+
+                // Cylinder runs from source to target, centred at the midpoint
+                _pos.addScaledVector(_dir, 0.5);
+                _dir.normalize();
+                _quat.setFromUnitVectors(_up, _dir);
+                _scale.set(edge.thickness, distance, edge.thickness);
+                cylinderMesh.setMatrixAt(i, _matrix.compose(_pos, _quat, _scale));
+
+                // Arrow head (cone) at the target, pointing in direction of flow
                 const arrowSize = edge.thickness * 3;
-                const arrowPos = edge.target.clone().sub(arrowDirection.multiplyScalar(0.5 + arrowSize));
-                edge.cone.position.copy(arrowPos);
-                edge.cone.quaternion.setFromUnitVectors(
-                    new THREE.Vector3(0, 1, 0),
-                    arrowDirection
-                );
-            }});
-        }}
-
-        // Mouse interaction
-        const raycaster = new THREE.Raycaster();
-        const mouse = new THREE.Vector2();
-        const nodeInfo = document.getElementById('node-info');
-
-        container.addEventListener('click', (event) => {{
-            const rect = container.getBoundingClientRect();
-            mouse.x = ((event.clientX - rect.left) / rect.width) * 2 - 1;
-            mouse.y = -((event.clientY - rect.top) / rect.height) * 2 + 1;
-
-            raycaster.setFromCamera(mouse, camera);
-            const intersects = raycaster.intersectObjects(nodeMeshes);
-
-            if (intersects.length > 0) {{
-                const node = intersects[0].object.userData;
-                const sanctionStatus = node.is_sanctioned ?
-                    '<span style="color: #ff6666;">SANCTIONED</span>' :
-                    '<span style="color: #66b3ff;">Not Sanctioned</span>';
-                const addressType = node.is_contract ? 'Contract' : 'EOA';
-
-                nodeInfo.innerHTML = `
-                    <strong>${{node.entity || 'Unknown Entity'}}</strong><br>
-                    <small>${{node.address.substring(0, 10)}}...</small><br>
-                    <strong>Type:</strong> ${{addressType}}<br>
-                    <strong>Status:</strong> ${{sanctionStatus}}
-                `;
-                nodeInfo.classList.add('active');
-            }} else {{
-                nodeInfo.classList.remove('active');
-            }}
-        }});
-
-        // Animation loop
-        function animate() {{
-            requestAnimationFrame(animate);
-            applyForces();
-            controls.update();
-            renderer.render(scene, camera);
-        }}
-
-        animate();
-
-        // Control functions
-        function resetCamera() {{
-            camera.position.set(0, 0, 30);
-            controls.reset();
-        }}
-
-        function toggleAnimation() {{
-            animating = !animating;
-        }}
-
-        // Handle window resize
-        window.addEventListener('resize', () => {{
-            camera.aspect = container.clientWidth / container.clientHeight;
-            camera.updateProjectionMatrix();
-            renderer.setSize(container.clientWidth, container.clientHeight);
-        }});
+                _pos.fromArray(pos, 3 * edge.target).addScaledVector(_dir, -(0.5 + arrowSize));
+                _scale.setScalar(arrowSize);
+                coneMesh.setMatrixAt(i, _matrix.compose(_pos, _quat, _scale));
+            }
+
+            for (let i = 0; i < edgeInstances.length; i++) {
+                updateEdgeInstance(i);
+            }
+
+            // Frustum culling tests a mesh's geometry bounds, which for the unit instance geometries
+            // say nothing about where the instances are. All three meshes share one sphere around the
+            // whole graph instead, padded to cover node spheres, edge thickness and arrow heads that
+            // overhang short edges, and refreshed whenever nodes move.
+            const graphBounds = new THREE.Sphere();
+            const boundsMargin = NODE_RADIUS + 9 * edgeInstances.reduce((max, edge) => Math.max(max, edge.thickness), 0);
+            [nodeMesh, cylinderMesh, coneMesh].forEach(mesh => {
+                mesh.geometry.boundingSphere = graphBounds;
+            });
+
+            function updateGraphBounds() {
+                const center = graphBounds.center.set(0, 0, 0);
+                for (let i = 0; i < nodeCount; i++) {
+                    center.x += pos[3 * i];
+                    center.y += pos[3 * i + 1];
+                    center.z += pos[3 * i + 2];
+                }
+                if (nodeCount > 0) {
+                    center.divideScalar(nodeCount);
+                }
+                let maxDistanceSq = 0;
+                for (let i = 0; i < nodeCount; i++) {
+                    const dx = pos[3 * i] - center.x;
+                    const dy = pos[3 * i + 1] - center.y;
+                    const dz = pos[3 * i + 2] - center.z;
+                    maxDistanceSq = Math.max(maxDistanceSq, dx * dx + dy * dy + dz * dz);
+                }
+                graphBounds.radius = Math.sqrt(maxDistanceSq) + boundsMargin;
+            }
+
+            updateGraphBounds();
+
+            // Spring neighbours in CSR form: node i is linked to neighborIndex[neighborStart[i]]
+            // up to neighborIndex[neighborStart[i + 1]], so each frame only visits a node's own edges.
+            // An edge pulls both endpoints toward each other, so it is listed under both.
+            const neighborStart = new Int32Array(nodeCount + 1);
+            edgeInstances.forEach(edge => {
+                neighborStart[edge.source + 1]++;
+                neighborStart[edge.target + 1]++;
+            });
+            for (let i = 0; i < nodeCount; i++) {
+                neighborStart[i + 1] += neighborStart[i];
+            }
+            const neighborIndex = new Int32Array(neighborStart[nodeCount]);
+            const neighborFill = neighborStart.slice(0, nodeCount);
+            edgeInstances.forEach(edge => {
+                neighborIndex[neighborFill[edge.source]++] = edge.target;
+                neighborIndex[neighborFill[edge.target]++] = edge.source;
+            });
+
+            // Force-directed simulation over the flat position buffer. It only uses its arguments, so
+            // its source can also be loaded into a Web Worker.
+            function createSimulation(pos, nodeCount, neighborStart, neighborIndex) {
+                const repulsionStrength = 1.5;      // Reduced from 2
+                const desiredEdgeLength = 5;        // Target edge length
+                const springStrength = 0.02;        // Spring force to maintain edge length
+                const damping = 0.9;
+                const vel = new Float32Array(3 * nodeCount);
+
+                // Uniform grid for repulsion: with cells as wide as the cutoff, every node within range
+                // of a node lies in its own or one of the 26 surrounding cells. Each cell holds a linked
+                // list of node indices (cellHead -> cellNext).
+                const REPULSION_CUTOFF = 20;
+                const cellHead = new Map();
+                const cellNext = new Int32Array(nodeCount);
+
+                // Pack 10 bits per axis; far-apart cells that alias only add candidates the distance test rejects
+                function cellKey(ix, iy, iz) {
+                    return ((ix & 1023) << 20) | ((iy & 1023) << 10) | (iz & 1023);
+                }
+
+                function rebuildGrid() {
+                    cellHead.clear();
+                    for (let i = 0; i < nodeCount; i++) {
+                        const key = cellKey(
+                            Math.floor(pos[3 * i] / REPULSION_CUTOFF),
+                            Math.floor(pos[3 * i + 1] / REPULSION_CUTOFF),
+                            Math.floor(pos[3 * i + 2] / REPULSION_CUTOFF)
+                        );
+                        const head = cellHead.get(key);
+                        cellNext[i] = head === undefined ? -1 : head;
+                        cellHead.set(key, i);
+                    }
+                }
+
+                // Advance the layout one step in place; returns the mean squared node speed
+                return function step() {
+                    let energy = 0;
+
+                    rebuildGrid();
+                    for (let i = 0; i < nodeCount; i++) {
+                        const i3 = 3 * i;
+                        const px = pos[i3], py = pos[i3 + 1], pz = pos[i3 + 2];
+                        let vx = vel[i3], vy = vel[i3 + 1], vz = vel[i3 + 2];
+
+                        // Repulsion between nodes (inverse square law), from nodes in the surrounding cells
+                        const cx = Math.floor(px / REPULSION_CUTOFF);
+                        const cy = Math.floor(py / REPULSION_CUTOFF);
+                        const cz = Math.floor(pz / REPULSION_CUTOFF);
+                        for (let ox = -1; ox <= 1; ox++) {
+                            for (let oy = -1; oy <= 1; oy++) {
+                                for (let oz = -1; oz <= 1; oz++) {
+                                    let j = cellHead.get(cellKey(cx + ox, cy + oy, cz + oz));
+                                    for (; j !== undefined && j !== -1; j = cellNext[j]) {
+                                        if (i === j) continue;
+                                        const j3 = 3 * j;
+                                        const dx = px - pos[j3], dy = py - pos[j3 + 1], dz = pz - pos[j3 + 2];
+                                        const distSq = dx * dx + dy * dy + dz * dz;
+                                        if (distSq > 0 && distSq < REPULSION_CUTOFF * REPULSION_CUTOFF) {
+                                            // Unit direction scaled by strength / distance^2
+                                            const force = repulsionStrength / (distSq * Math.sqrt(distSq));
+                                            vx += dx * force;
+                                            vy += dy * force;
+                                            vz += dz * force;
+                                        }
+                                    }
+                                }
+                            }
+                        }
+
+                        // Spring forces along edges (Hooke's law), in both directions
+                        for (let k = neighborStart[i]; k < neighborStart[i + 1]; k++) {
+                            const j3 = 3 * neighborIndex[k];
+                            const dx = pos[j3] - px, dy = pos[j3 + 1] - py, dz = pos[j3 + 2] - pz;
+                            const distance = Math.sqrt(dx * dx + dy * dy + dz * dz);
+                            if (distance > 0) {
+                                // Spring force: F = k * (distance - desiredLength), along the unit direction
+                                const force = springStrength * (distance - desiredEdgeLength) / distance;
+                                vx += dx * force;
+                                vy += dy * force;
+                                vz += dz * force;
+                            }
+                        }
+
+                        // Apply damping
+                        vx *= damping;
+                        vy *= damping;
+                        vz *= damping;
+                        vel[i3] = vx;
+                        vel[i3 + 1] = vy;
+                        vel[i3 + 2] = vz;
+                        energy += vx * vx + vy * vy + vz * vz;
+
+                        // Update position
+                        pos[i3] = px + vx;
+                        pos[i3 + 1] = py + vy;
+                        pos[i3 + 2] = pz + vz;
+                    }
+
+                    return nodeCount ? energy / nodeCount : 0;
+                };
+            }
+
+            // Drives a simulation from init/pause/resume messages: steps it on a timer and sends each
+            // new position buffer to post, stopping once the layout has settled
+            function createSimulationHost(post) {
+                let pos = null;
+                let step = null;
+                let interval = 0;
+                let settleEnergy = 0;
+                let timer = null;
+
+                function stop() {
+                    if (timer !== null) {
+                        clearInterval(timer);
+                        timer = null;
+                    }
+                }
+
+                function start() {
+                    if (step && timer === null) {
+                        timer = setInterval(tick, interval);
+                    }
+                }
+
+                function tick() {
+                    const settled = step() < settleEnergy;
+                    const out = pos.slice();
+                    post({ pos: out }, [out.buffer]);
+                    if (settled) stop();
+                }
+
+                return message => {
+                    if (message.type === 'init') {
+                        pos = message.pos;
+                        step = createSimulation(pos, message.nodeCount, message.neighborStart, message.neighborIndex);
+                        interval = message.interval;
+                        settleEnergy = message.settleEnergy;
+                        start();
+                    } else if (message.type === 'resume') {
+                        start();
+                    } else if (message.type === 'pause') {
+                        stop();
+                    }
+                };
+            }
+
+            // The layout steps at a fixed rate, decoupled from rendering, and stops once the mean
+            // squared node speed drops below SETTLE_ENERGY
+            const SIMULATION_HZ = 30;
+            const SETTLE_ENERGY = 1e-4;
+            let animating = true;
+            let needsRender = true;
+
+            // Copy simulated positions into the node and edge instances
+            function applyPositions(newPos) {
+                pos.set(newPos);
+
+                // Node instance matrices are pure translations, so positions are written into them in place
+                const matrices = nodeMesh.instanceMatrix.array;
+                for (let i = 0; i < nodeCount; i++) {
+                    matrices[16 * i + 12] = pos[3 * i];
+                    matrices[16 * i + 13] = pos[3 * i + 1];
+                    matrices[16 * i + 14] = pos[3 * i + 2];
+                }
+                nodeMesh.instanceMatrix.needsUpdate = true;
+
+                // Update edge positions (cylinders and cones)
+                for (let i = 0; i < edgeInstances.length; i++) {
+                    updateEdgeInstance(i);
+                }
+                cylinderMesh.instanceMatrix.needsUpdate = true;
+                coneMesh.instanceMatrix.needsUpdate = true;
+                updateGraphBounds();
+                needsRender = true;
+            }
+
+            // Run the simulation in a worker built from the functions above, so it never blocks input
+            // or rendering; if workers are unavailable, host it on the main thread instead
+            let sendToSimulation;
+            try {
+                const workerSource = createSimulation.toString() + '\\n' + createSimulationHost.toString() +
+                    '\\nconst handle = createSimulationHost((data, transfer) => self.postMessage(data, transfer));' +
+                    '\\nself.onmessage = event => handle(event.data);';
+                const worker = new Worker(URL.createObjectURL(new Blob([workerSource], { type: 'application/javascript' })));
+                worker.onmessage = event => applyPositions(event.data.pos);
+                sendToSimulation = (message, transfer) => worker.postMessage(message, transfer || []);
+            } catch (e) {
+                const handle = createSimulationHost(data => applyPositions(data.pos));
+                sendToSimulation = message => handle(message);
+            }
+
+            const initialPos = pos.slice();
+            sendToSimulation({
+                type: 'init',
+                pos: initialPos,
+                nodeCount,
+                neighborStart,
+                neighborIndex,
+                interval: 1000 / SIMULATION_HZ,
+                settleEnergy: SETTLE_ENERGY
+            }, [initialPos.buffer]);
+
+            // Mouse interaction
+            const raycaster = new THREE.Raycaster();
+            const mouse = new THREE.Vector2();
+            const nodeInfo = document.getElementById('node-info');
+
+            // Index of the nearest node whose sphere the ray passes through, or -1. Spheres are
+            // tested analytically against the position buffer, with no per-instance matrices or
+            // triangle tests.
+            function pickNode(ray) {
+                const o = ray.origin, d = ray.direction;
+                const radiusSq = NODE_RADIUS * NODE_RADIUS;
+                let best = -1;
+                let bestDistance = Infinity;
+                for (let i = 0; i < nodeCount; i++) {
+                    const ox = pos[3 * i] - o.x, oy = pos[3 * i + 1] - o.y, oz = pos[3 * i + 2] - o.z;
+                    // Distance along the ray to the point closest to the centre, and the miss distance there
+                    const along = ox * d.x + oy * d.y + oz * d.z;
+                    const missSq = ox * ox + oy * oy + oz * oz - along * along;
+                    if (missSq > radiusSq) continue;
+                    const hit = along - Math.sqrt(radiusSq - missSq);
+                    if (hit > 0 && hit < bestDistance) {
+                        best = i;
+                        bestDistance = hit;
+                    }
+                }
+                return best;
+            }
+
+            container.addEventListener('click', (event) => {
+                const rect = container.getBoundingClientRect();
+                mouse.x = ((event.clientX - rect.left) / rect.width) * 2 - 1;
+                mouse.y = -((event.clientY - rect.top) / rect.height) * 2 + 1;
+
+                raycaster.setFromCamera(mouse, camera);
+                const picked = pickNode(raycaster.ray);
+
+                if (picked !== -1) {
+                    const node = nodes[picked];
+                    const sanctionStatus = node.is_sanctioned ?
+                        '<span style="color: #ff6666;">SANCTIONED</span>' :
+                        node.screened ?
+                        '<span style="color: #66b3ff;">Not Sanctioned</span>' :
+                        '<span style="color: #aaaaaa;">Not Screened</span>';
+                    const addressType = node.is_contract ? 'Contract' : 'EOA';
+
+                    nodeInfo.innerHTML = `
+                        <strong>${node.entity || 'Unknown Entity'}</strong><br>
+                        <small>${node.address.substring(0, 10)}...</small><br>
+                        <strong>Type:</strong> ${addressType}<br>
+                        <strong>Status:</strong> ${sanctionStatus}
+                    `;
+                    nodeInfo.classList.add('active');
+                } else {
+                    nodeInfo.classList.remove('active');
+                }
+            });
+
+            // Animation loop; only redraws when the layout or the camera has changed
+            function animate() {
+                requestAnimationFrame(animate);
+                if (controls.update() || needsRender) {
+                    needsRender = false;
+                    renderer.render(scene, camera);
+                }
+            }
+
+            animate();
+
+            // Control functions
+            function resetCamera() {
+                camera.position.set(0, 0, 30);
+                controls.reset();
+                needsRender = true;
+            }
+
+            function toggleAnimation() {
+                animating = !animating;
+                // Playing again also restarts a simulation that had settled
+                sendToSimulation({ type: animating ? 'resume' : 'pause' });
+            }
+
+            // Handle window resize
+            window.addEventListener('resize', () => {
+                camera.aspect = container.clientWidth / container.clientHeight;
+                camera.updateProjectionMatrix();
+                renderer.setSize(container.clientWidth, container.clientHeight);
+                needsRender = true;
+            });
+
+            // Exposed globally for the buttons' onclick handlers
+            window.resetCamera = resetCamera;
+            window.toggleAnimation = toggleAnimation;
+        });
     </script>
 </body>
-</html>"""
+</html>""".replace('__STYLE__', _CSS)
+
+# Alternating literal text and placeholder names, split once so each render is a single join
+_TEMPLATE_PARTS = re.split(r'__([A-Z_]+)__', _HTML_TEMPLATE)
+
+
+class IncidentVisualizer:
+    """Creates three.js force-directed graph visualizations of blockchain incidents."""
+
+    def __init__(self, three_js_path: Optional[str] = None):
+        """
+        Initialize the visualizer.
+
+        Args:
+            three_js_path: Optional directory containing three.min.js and OrbitControls.js
+                (three r128 non-module builds). When given, both are inlined into every page
+                so it needs no network access; otherwise they are loaded from CDNs.
+        """
+        self._script_tags = _inline_script_tags(three_js_path) if three_js_path else _CDN_SCRIPT_TAGS
+
+    def generate_html(
+        self,
+        incident_data: Dict,
+        network_data: Dict,
+        risk_data: Dict,
+        output_path: str,
+        analysis_text: str = "",
+        compress: bool = True
+    ) -> str:
+        """
+        Generate an HTML file with embedded three.js visualization.
+
+        The file is replaced atomically, and left untouched if its content is unchanged.
+
+        Args:
+            incident_data: Incident information
+            network_data: Network graph data with nodes and edges
+            risk_data: Risk assessment data
+            output_path: Path where the HTML file will be saved
+            analysis_text: Comprehensive analysis text in markdown format
+            compress: Also write a gzip-compressed copy to output_path + '.gz', for static
+                hosts that serve precompressed files
+
+        Returns:
+            Path to the generated HTML file
+        """
+        # Prepare data for visualization
+        nodes = network_data.get('nodes', [])
+        edges = network_data.get('edges', [])
+
+        # Ensure output directory exists
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # Project, render and serialize the page content once; the hash pass and the write
+        # pass below only stream it out
+        values = self._template_values(incident_data, nodes, edges, risk_data, analysis_text)
+
+        # Hash the rendered page without writing it anywhere, and leave the existing files
+        # untouched if they already hold it: no disk writes, and their mtime (and the ETags
+        # and caches derived from it) stays valid
+        hasher = hashlib.blake2b(digest_size=16)
+        _write_template(_Utf8Tee([hasher.update]), values)
+        trailer = _HASH_TRAILER.format(hasher.hexdigest()).encode('ascii')
+        targets = [output_path, output_path + '.gz'] if compress else [output_path]
+        if (
+            _read_tail(output_path, len(trailer)) == trailer
+            and all(os.path.exists(path) for path in targets[1:])
+        ):
+            return output_path
+
+        # Stream the HTML to private temp files rather than building it in memory first,
+        # compressing the .gz copy in the same pass, then publish them atomically
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with ExitStack() as stack:
+                writers = [stack.enter_context(open(output_path + tmp_suffix, 'wb', buffering=WRITE_BUFFER_SIZE)).write]
+                if compress:
+                    # mtime=0 keeps the archive identical for identical HTML
+                    writers.append(stack.enter_context(gzip.GzipFile(
+                        output_path + '.gz' + tmp_suffix, 'wb', compresslevel=GZIP_COMPRESS_LEVEL, mtime=0
+                    )).write)
+                _write_template(_Utf8Tee(writers), values)
+                for write in writers:
+                    write(trailer)
+
+            for path in targets:
+                os.replace(path + tmp_suffix, path)
+        finally:
+            for path in targets:
+                if os.path.exists(path + tmp_suffix):
+                    os.remove(path + tmp_suffix)
+
+        return output_path
+
+    def _template_values(
+        self,
+        incident_data: Dict,
+        nodes: List[Dict],
+        edges: List[Dict],
+        risk_data: Dict,
+        analysis_text: str = ""
+    ) -> Dict[str, Union[str, List[str]]]:
+        """
+        Build the values for the page template's placeholders.
+
+        Args:
+            incident_data: Incident information
+            nodes: List of network nodes
+            edges: List of network edges
+            risk_data: Risk assessment data
+            analysis_text: Comprehensive analysis text in markdown format
+
+        Returns:
+            Replacement keyed by placeholder name, as _write_template takes it; the node and
+            edge JSON are lists of fragments so the page can be written more than once
+        """
+        # Handle edge cases where nodes/edges might not be lists
+        if not isinstance(nodes, list):
+            nodes = []
+        if not isinstance(edges, list):
+            edges = []
+
+        # Embed only the fields the page reads, with node colors resolved here rather than in
+        # the page. These are new dicts, so the caller's nodes (which may be shared with a
+        # cache) are never modified.
+        nodes = [
+            {
+                'address': node.get('address'),
+                'entity': node.get('entity'),
+                'is_sanctioned': bool(node.get('is_sanctioned')),
+                'screened': bool(node.get('screened', True)),
+                'is_contract': bool(node.get('is_contract')),
+                'color': _node_color(node),
+            }
+            for node in nodes
+        ]
+
+        # Edge thickness scales with volume across the network's range (0.05 to 0.3)
+        volumes = [edge.get('volume') or 0 for edge in edges]
+        min_volume = min(volumes, default=0)
+        volume_range = (max(volumes, default=0) - min_volume) or 1
+        edges = [
+            {
+                'source': edge.get('source'),
+                'target': edge.get('target'),
+                'thickness': round(0.05 + (volume - min_volume) / volume_range * 0.25, 4),
+            }
+            for edge, volume in zip(edges, volumes)
+        ]
 
-        return html
+        # Render the markdown analysis once here rather than on every page load
+        if analysis_text and analysis_text.strip():
+            analysis_html = _MARKDOWN.render(analysis_text)
+        else:
+            analysis_html = _NO_ANALYSIS_HTML
+
+        is_sanctioned = risk_data.get('is_sanctioned')
+
+        return {
+            'INCIDENT_NAME': str(incident_data.get('name', 'Unknown Incident')),
+            'INCIDENT_ID': str(incident_data.get('id', 'unknown')),
+            'INCIDENT_DESC': str(incident_data.get('description', 'No description available')),
+            'BLOCKCHAIN': str(incident_data.get('blockchain', 'Unknown')),
+            'NODE_COUNT': str(len(nodes)),
+            'EDGE_COUNT': str(len(edges)),
+            'SANCTION_CLASS': 'risk-high' if is_sanctioned else '',
+            'SANCTION_STATUS': 'SANCTIONED' if is_sanctioned else 'Not Sanctioned',
+            'ANALYSIS_HTML': analysis_html,
+            'THREE_SCRIPTS': self._script_tags,
+            # Convert data to JSON for embedding, piece by piece
+            'NODES_JSON': list(_iter_json_array(nodes)),
+            'EDGES_JSON': list(_iter_json_array(edges)),
+        }
 
 
 if __name__ == "__main__":
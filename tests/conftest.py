@@ -0,0 +1,5 @@
+"""Shared pytest setup: make the modules in src importable, as run.py does."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,136 @@
+"""Tests for the agent's tool-result caches."""
+import json
+import shelve
+import threading
+import zlib
+
+import orjson
+import pytest
+
+import agent as agent_module
+from agent import COMPACT_MIN_CHARS, BlockchainIncidentAgent, _compact_tool_results
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    # Cache roots are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    instance = BlockchainIncidentAgent()
+    instance.current_incident_id = "incident-1"
+    yield instance
+    instance.close()
+
+
+_shelve_open = shelve.open
+
+
+class _ThreadBoundShelf:
+    """Shelf that fails when used from a thread other than the one that opened it, like dbm.sqlite3."""
+
+    def __init__(self, path):
+        self._owner = threading.get_ident()
+        self._shelf = _shelve_open(path)
+
+    def _check(self):
+        if threading.get_ident() != self._owner:
+            raise RuntimeError("cache database used from another thread")
+
+    def get(self, key, default=None):
+        self._check()
+        return self._shelf.get(key, default)
+
+    def __setitem__(self, key, value):
+        self._check()
+        self._shelf[key] = value
+
+    def sync(self):
+        self._check()
+        self._shelf.sync()
+
+    def close(self):
+        self._check()
+        self._shelf.close()
+
+
+def test_cache_database_stays_on_one_thread(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr(agent_module.shelve, "open", _ThreadBoundShelf)
+    agent = BlockchainIncidentAgent()
+    agent.current_incident_id = "incident-1"
+    data = {"normal": [{"from": "0xa", "to": "0xb", "hash": "0x1"}], "token": []}
+
+    agent._cache_put(agent._tx_cache, "transaction-cache", "key", data)
+    agent._tx_cache.clear()
+    # Read from a thread other than the caller's, as parallel tool calls do
+    result = []
+    reader = threading.Thread(target=lambda: result.append(
+        agent._cache_get(agent._tx_cache, "transaction-cache", "key")
+    ))
+    reader.start()
+    reader.join()
+
+    assert result == [data]
+    agent.close()
+    assert agent._cache_dbs == {}
+    # Any cross-thread use would have been logged as a read, write or close failure
+    assert not caplog.records
+
+
+def _tool_turn(content):
+    return {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t", "content": content}]}
+
+
+def test_compact_tool_results_keeps_recent_turns():
+    instructions = {"role": "user", "content": "x" * (COMPACT_MIN_CHARS * 2)}
+    keyed = json.dumps({"cache_key": "abc", "rows": ["y" * 100]})
+    large = json.dumps({"data": "z" * COMPACT_MIN_CHARS})
+    small = json.dumps({"ok": True})
+    recent = [_tool_turn(large), _tool_turn(large)]
+    messages = [instructions, _tool_turn(keyed), _tool_turn(large), _tool_turn(small), *recent]
+
+    _compact_tool_results(messages, keep_turns=2)
+
+    contents = [message["content"] for message in messages]
+    assert contents[0] == instructions["content"]
+    assert contents[1][0]["content"] == "[cached: abc]"
+    assert contents[2][0]["content"].startswith("[elided: ")
+    assert contents[3][0]["content"] == small
+    assert [turn["content"][0]["content"] for turn in recent] == [large, large]
+
+    # Compacting again leaves the placeholders alone
+    snapshot = json.dumps(messages)
+    _compact_tool_results(messages, keep_turns=2)
+    assert json.dumps(messages) == snapshot
+
+
+def test_cache_round_trip_through_disk(agent):
+    data = {"normal": [{"from": "0xa", "to": "0xb", "hash": "0x1"}], "token": []}
+    agent._cache_put(agent._net_cache, "network-cache", "net", data)
+    agent._net_cache.clear()
+
+    assert agent._cache_get(agent._net_cache, "network-cache", "net") == data
+    assert agent._cache_get(agent._net_cache, "network-cache", "missing") is None
+
+
+def test_cache_reads_entries_stored_before_compression(agent):
+    data = {"nodes": [{"address": "0xa"}], "edges": []}
+    cache_path = agent._cache_path("network-cache")
+
+    def store_uncompressed():
+        agent._cache_db(cache_path)["old"] = orjson.dumps(data)
+
+    agent._spill_executor.submit(store_uncompressed).result()
+
+    assert agent._cache_get(agent._net_cache, "network-cache", "old") == data
+
+
+def test_cache_entries_are_compressed_on_disk(agent):
+    data = {"nodes": [{"address": "0xa"}] * 100, "edges": []}
+    agent._cache_put(agent._net_cache, "network-cache", "net", data)
+    cache_path = agent._cache_path("network-cache")
+
+    raw = agent._spill_executor.submit(lambda: agent._cache_db(cache_path)["net"]).result()
+
+    assert orjson.loads(zlib.decompress(raw)) == data
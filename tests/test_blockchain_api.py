@@ -0,0 +1,52 @@
+"""Tests for the Moralis explorer client's network crawl."""
+from blockchain_api import BlockchainExplorerAPI
+
+
+# Transfers between addresses; a-b-c form a cycle, and d hangs off c
+GRAPH = {
+    "0xa": [("0xa", "0xb"), ("0xc", "0xa")],
+    "0xb": [("0xa", "0xb"), ("0xb", "0xc")],
+    "0xc": [("0xb", "0xc"), ("0xc", "0xa"), ("0xc", "0xd")],
+    "0xd": [("0xc", "0xd")],
+}
+
+
+def _crawler(monkeypatch):
+    """Explorer whose batch fetch serves GRAPH and records each requested level."""
+    api = BlockchainExplorerAPI(api_key="test-key")
+    levels = []
+
+    def fetch_batch(addresses, limit=100):
+        levels.append(sorted(addresses))
+        return {
+            address: {
+                "normal": [{"from": src, "to": dst, "hash": f"{src}-{dst}"} for src, dst in GRAPH[address]],
+                "token": [],
+            }
+            for address in addresses
+        }
+
+    monkeypatch.setattr(api, "get_all_transactions_batch", fetch_batch)
+    return api, levels
+
+
+def test_network_crawl_fetches_each_address_once(monkeypatch):
+    api, levels = _crawler(monkeypatch)
+
+    result = api.get_network_transactions("0xA", depth=3)
+
+    # b and c are both found from a, so neither is queued again from the other
+    assert levels == [["0xa"], ["0xb", "0xc"], ["0xd"]]
+    assert len(result["normal"]) == sum(len(GRAPH[address]) for address in GRAPH)
+    assert result["token"] == []
+
+
+def test_network_crawl_stops_at_depth(monkeypatch):
+    api, levels = _crawler(monkeypatch)
+
+    api.get_network_transactions("0xa", depth=1)
+    assert levels == [["0xa"]]
+
+    levels.clear()
+    api.get_network_transactions("0xa", depth=2)
+    assert levels == [["0xa"], ["0xb", "0xc"]]
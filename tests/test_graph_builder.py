@@ -0,0 +1,25 @@
+"""Tests for building the transaction graph."""
+from graph_builder import GraphBuilder
+
+
+PRIMARY = "0x2e8a8670b734e260cedbc6d5a05532264aae5c38"
+OTHER = "0x1111111111111111111111111111111111111abc"
+
+
+def _tx(tx_hash, from_addr, to_addr, value="1000000000000000000"):
+    return {"hash": tx_hash, "from": from_addr, "to": to_addr, "value": value}
+
+
+def test_mixed_case_addresses_share_one_node():
+    builder = GraphBuilder(PRIMARY.upper().replace("0X", "0x"), "ethereum")
+    builder.add_transactions({"normal": [
+        _tx("0x1", OTHER, PRIMARY),
+        _tx("0x2", OTHER.upper().replace("0X", "0x"), PRIMARY.upper().replace("0X", "0x")),
+    ]})
+
+    network = builder.build_network()
+
+    assert sorted(node["address"] for node in network["nodes"]) == sorted([OTHER, PRIMARY])
+    assert len(network["edges"]) == 1
+    assert network["edges"][0]["transaction_count"] == 2
+    assert network["edges"][0]["volume"] == 2.0
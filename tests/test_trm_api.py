@@ -0,0 +1,158 @@
+"""Tests for the TRM Labs sanctions screening client."""
+import logging
+
+import orjson
+import pytest
+import requests
+
+import trm_api
+from trm_api import (
+    CIRCUIT_COOLDOWN_SECONDS,
+    CIRCUIT_FAILURE_THRESHOLD,
+    SCREENING_BATCH_SIZE,
+    TRMLabsAPI,
+)
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response."""
+
+    def __init__(self, payload, status_code=200):
+        self.content = orjson.dumps(payload)
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+
+@pytest.fixture
+def client():
+    return TRMLabsAPI(api_key="test-key", warmup=False)
+
+
+def _respond(client, monkeypatch, respond):
+    """Route the client's screening POSTs to respond(payload), recording each payload."""
+    calls = []
+
+    def post(url, data=None, timeout=None):
+        payload = orjson.loads(data)
+        calls.append(payload)
+        return respond(payload)
+
+    monkeypatch.setattr(client.session, "post", post)
+    return calls
+
+
+def test_batch_matches_results_by_position_without_address(client, monkeypatch):
+    # Same order as the request, but no address field
+    _respond(client, monkeypatch, lambda payload: FakeResponse([
+        {"isSanctioned": i == 1, "name": f"Entity {i}"} for i in range(len(payload))
+    ]))
+
+    results = client.screen_addresses_batch(["0xAAA", "0xbbb", "0xccc"])
+
+    assert results["0xbbb"]["isSanctioned"] is True
+    assert results["0xaaa"]["name"] == "Entity 0"
+    assert all(result.get("screened", True) for result in results.values())
+
+
+def test_batch_marks_unmatched_addresses_unscreened(client, monkeypatch, caplog):
+    # Fewer results than requested and no addresses: nothing can be matched safely
+    _respond(client, monkeypatch, lambda payload: FakeResponse([{"isSanctioned": True}]))
+
+    with caplog.at_level(logging.WARNING, logger="trm_api"):
+        results = client.screen_addresses_batch(["0xaaa", "0xbbb"])
+
+    assert all(result["screened"] is False for result in results.values())
+    assert "no matching screening result for 2 of 2" in caplog.text
+
+
+def test_failed_chunk_is_flagged_unscreened(client, monkeypatch):
+    _respond(client, monkeypatch, lambda payload: FakeResponse({"error": "boom"}, status_code=400))
+
+    results = client.screen_addresses_batch(["0xaaa", "0xbbb"])
+
+    for result in results.values():
+        assert result["screened"] is False
+        assert result["isSanctioned"] is False
+        assert "Screening request failed" in result["error"]
+    risk = client.get_address_risks(["0xaaa"])["0xaaa"]
+    assert risk["screened"] is False and risk["screening_error"]
+
+
+def _echo(payload):
+    """Respond with a clean screening result for every requested address."""
+    return FakeResponse([{"address": item["address"], "isSanctioned": False} for item in payload])
+
+
+def test_batch_screening_chunks_requests_and_reuses_cache(client, monkeypatch):
+    calls = _respond(client, monkeypatch, _echo)
+    addresses = [f"0x{i:040X}" for i in range(SCREENING_BATCH_SIZE * 2 + 50)]
+
+    results = client.screen_addresses_batch(addresses)
+
+    assert sorted(len(payload) for payload in calls) == [50, SCREENING_BATCH_SIZE, SCREENING_BATCH_SIZE]
+    assert set(results) == {address.lower() for address in addresses}
+    assert all(result.get("screened", True) for result in results.values())
+
+    # Everything is cached now, so a repeat screening sends nothing
+    client.screen_addresses_batch(addresses)
+    assert len(calls) == 3
+    assert client.cache_stats()["hits"] == len(addresses)
+
+
+def test_circuit_breaker_opens_after_repeated_failures(client, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(trm_api.time, "monotonic", lambda: now[0])
+    healthy = [False]
+    calls = _respond(client, monkeypatch, lambda payload: (
+        _echo(payload) if healthy[0] else FakeResponse({}, status_code=500)
+    ))
+
+    for i in range(CIRCUIT_FAILURE_THRESHOLD):
+        client.screen_addresses_batch([f"0x{i}"])
+    assert len(calls) == CIRCUIT_FAILURE_THRESHOLD
+
+    # Open: no request is sent, and the fallback says why
+    result = client.screen_addresses_batch(["0xopen"])["0xopen"]
+    assert len(calls) == CIRCUIT_FAILURE_THRESHOLD
+    assert result["screened"] is False and "paused" in result["error"]
+
+    # After the cooldown one probe goes out, and its success closes the circuit
+    now[0] += CIRCUIT_COOLDOWN_SECONDS + 1
+    healthy[0] = True
+    assert client.screen_addresses_batch(["0xprobe"])["0xprobe"].get("screened", True)
+    client.screen_addresses_batch(["0xnext"])
+    assert len(calls) == CIRCUIT_FAILURE_THRESHOLD + 2
+
+
+def test_screening_cache_persists_unexpired_results(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "trm" / "screening.json")
+    now = [1_000_000.0]
+    monkeypatch.setattr(trm_api.time, "time", lambda: now[0])
+
+    first = TRMLabsAPI(api_key="test-key", warmup=False, cache_file=cache_file, cache_ttl_seconds=60)
+    _respond(first, monkeypatch, _echo)
+    first.screen_addresses_batch(["0xOld"])
+    now[0] += 45
+    first.screen_addresses_batch(["0xnew"])
+    first.save_cache()
+
+    # 0xold is 75 s old by now, past the 60 s TTL; 0xnew is 30 s old
+    now[0] += 30
+    second = TRMLabsAPI(api_key="test-key", warmup=False, cache_file=cache_file, cache_ttl_seconds=60)
+    calls = _respond(second, monkeypatch, _echo)
+    second.screen_addresses_batch(["0xnew"])
+    assert calls == []
+    second.screen_addresses_batch(["0xold"])
+    assert calls == [[{"address": "0xold", "chain": "ethereum"}]]
+
+
+def test_unreadable_screening_cache_is_ignored(tmp_path):
+    cache_file = tmp_path / "screening.json"
+    cache_file.write_text("not json")
+
+    client = TRMLabsAPI(api_key="test-key", warmup=False, cache_file=str(cache_file))
+
+    assert client.cache_stats()["entries"] == 0
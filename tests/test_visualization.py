@@ -0,0 +1,80 @@
+"""Tests for the HTML visualization generator."""
+import gzip
+import os
+
+import pytest
+
+import visualization
+from visualization import IncidentVisualizer
+
+
+NETWORK = {
+    "nodes": [
+        {"address": "0xaaa", "entity": "Primary Address", "is_sanctioned": True, "is_contract": False},
+        {"address": "0xbbb", "entity": "Address 0xbbb...", "is_sanctioned": False, "is_contract": True},
+    ],
+    "edges": [{"source": "0xaaa", "target": "0xbbb", "volume": 1.5}],
+}
+
+
+@pytest.fixture
+def visualizer():
+    return IncidentVisualizer()
+
+
+def _render(visualizer, tmp_path, analysis_text="", **kwargs):
+    """Generate a page into tmp_path and return its HTML."""
+    path = visualizer.generate_html(
+        {"id": "inc-1", "name": "Test"}, NETWORK, {}, str(tmp_path / "page.html"),
+        analysis_text=analysis_text, compress=False, **kwargs
+    )
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_analysis_list_without_blank_line(visualizer, tmp_path):
+    html = _render(visualizer, tmp_path, "Summary:\n- first\n- second\n\n**Risk:**\n- high")
+    assert "<p>Summary:</p>\n<ul>\n<li>first</li>\n<li>second</li>\n</ul>" in html
+    assert "<p><strong>Risk:</strong></p>\n<ul>\n<li>high</li>\n</ul>" in html
+
+
+def test_analysis_nested_list_and_table(visualizer, tmp_path):
+    html = _render(visualizer, tmp_path, "- outer\n  - inner\n\n| a | b |\n|---|---|\n| 1 | 2 |")
+    assert "<li>outer\n<ul>\n<li>inner</li>\n</ul>\n</li>" in html
+    assert "<th>a</th>" in html and "<td>2</td>" in html
+
+
+def test_missing_analysis_shows_placeholder(visualizer, tmp_path):
+    assert "No detailed analysis available" in _render(visualizer, tmp_path, "  \n")
+
+
+def test_unchanged_page_is_not_rewritten(visualizer, tmp_path, monkeypatch):
+    path = str(tmp_path / "out" / "page.html")
+    visualizer.generate_html({"id": "inc-1"}, NETWORK, {}, path, analysis_text="# Findings")
+    with open(path, "rb") as f:
+        html = f.read()
+    with gzip.open(path + ".gz") as f:
+        assert f.read() == html
+
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(visualization.os, "replace", lambda src, dst: (replaced.append(dst), real_replace(src, dst)))
+
+    visualizer.generate_html({"id": "inc-1"}, NETWORK, {}, path, analysis_text="# Findings")
+    assert replaced == []
+    assert sorted(os.listdir(tmp_path / "out")) == ["page.html", "page.html.gz"]
+
+    visualizer.generate_html({"id": "inc-1"}, NETWORK, {}, path, analysis_text="# Revised findings")
+    assert replaced == [path, path + ".gz"]
+    with open(path, "rb") as f:
+        assert f.read() != html
+
+
+def test_missing_gzip_copy_is_regenerated(visualizer, tmp_path):
+    path = str(tmp_path / "page.html")
+    visualizer.generate_html({"id": "inc-1"}, NETWORK, {}, path)
+    os.remove(path + ".gz")
+
+    visualizer.generate_html({"id": "inc-1"}, NETWORK, {}, path)
+
+    assert os.path.exists(path + ".gz")